@@ -0,0 +1,86 @@
+"""Compare the SQL and in-process index paths of recipe_by_ingredients.
+
+    python -m benchmarks.bench_ingredient_index --links 10000 100000 1000000
+"""
+import argparse
+import random
+import time
+from datetime import timedelta
+
+from sqlalchemy import and_
+from sqlmodel import SQLModel, Session, create_engine, select
+
+from models.recipes import Recipe, Ingredient, RecipeIngredientLink
+from models.auth import User  # noqa: F401 (recipe.owner_id foreign key)
+from database.recipes import recipes_with_all_ingredients_query
+from database.ingredient_index import IngredientIndex
+
+INGREDIENTS = 2000
+INGREDIENTS_PER_RECIPE = 8
+
+
+def populate(engine, links: int, seed: int = 0):
+    rng = random.Random(seed)
+    recipes = links // INGREDIENTS_PER_RECIPE
+    # Skewed popularity so that some ingredients (salt, oil...) appear everywhere
+    weights = [1 / (rank + 1) for rank in range(INGREDIENTS)]
+    with engine.begin() as connection:
+        connection.execute(Ingredient.__table__.insert(),
+                           [{"id": i, "name": f"ingredient{i}"} for i in range(1, INGREDIENTS + 1)])
+        connection.execute(Recipe.__table__.insert(),
+                           [{"id": r, "name": f"recipe{r}", "difficulty": "easy", "recipe_type": None,
+                             "steps": None, "duration": timedelta(minutes=30)} for r in range(1, recipes + 1)])
+        rows = []
+        for recipe_id in range(1, recipes + 1):
+            for ingredient_id in set(rng.choices(range(1, INGREDIENTS + 1), weights, k=INGREDIENTS_PER_RECIPE)):
+                rows.append({"recipe_id": recipe_id, "ingredient_id": ingredient_id})
+        connection.execute(RecipeIngredientLink.__table__.insert(), rows)
+
+
+def timed(func, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def run(links: int, repeat: int):
+    engine = create_engine("sqlite://")
+    SQLModel.metadata.create_all(engine)
+    populate(engine, links)
+    queries = [[1, 2], [1, 3, 5], [2, 7, 11, 13], [1, 2, 3, 4, 5, 6]]
+
+    with Session(engine) as session:
+        start = time.perf_counter()
+        index = IngredientIndex()
+        index.build(session.exec(select(RecipeIngredientLink.recipe_id, RecipeIngredientLink.ingredient_id)))
+        build_ms = (time.perf_counter() - start) * 1000
+
+        def exists_path():
+            for ids in queries:
+                ingredients = [session.get(Ingredient, i) for i in ids]
+                session.exec(select(Recipe.id).where(
+                    and_(*[Recipe.ingredients.contains(i) for i in ingredients]))).all()
+
+        def group_by_path():
+            for ids in queries:
+                session.exec(recipes_with_all_ingredients_query(ids)).all()
+
+        def index_path():
+            for ids in queries:
+                index.recipes_with_all(ids)
+
+        results = {name: timed(func, repeat) / len(queries)
+                   for name, func in (("sql exists", exists_path), ("sql group by", group_by_path),
+                                      ("index", index_path))}
+    print(f"{links:>9} links  build {build_ms:8.1f} ms  " +
+          "  ".join(f"{name} {ms:8.3f} ms" for name, ms in results.items()))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--links", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    for links in args.links:
+        run(links, args.repeat)
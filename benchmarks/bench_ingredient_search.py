@@ -0,0 +1,57 @@
+"""Latency of the in-process ingredient autocomplete over a synthetic vocabulary.
+
+    python -m benchmarks.bench_ingredient_search --vocabulary 50000
+"""
+import argparse
+import random
+import string
+import time
+
+from database.ingredient_search import IngredientSearchIndex
+
+
+def vocabulary(size: int, syllables: int = 200, seed: int = 0) -> list[str]:
+    # Made-up words of 2-5 syllables; fewer distinct syllables means denser trigram postings
+    rng = random.Random(seed)
+    syllables = sorted({rng.choice("bcdfglmnprstvz") + rng.choice("aeiou") + rng.choice(["", "", "n", "r", "s", "l"])
+                        for _ in range(syllables * 3)})[:syllables]
+    names = set()
+    while len(names) < size:
+        names.add("".join(rng.choices(syllables, k=rng.randint(2, 5))))
+    return sorted(names)
+
+
+def typo(name: str, rng: random.Random) -> str:
+    i = rng.randrange(len(name))
+    return name[:i] + rng.choice(string.ascii_lowercase) + name[i + 1:]
+
+
+def run(size: int, syllables: int, queries: int):
+    names = vocabulary(size, syllables)
+    index = IngredientSearchIndex()
+    start = time.perf_counter()
+    index.build(enumerate(names, 1))
+    print(f"{size} ingredients, build {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    rng = random.Random(1)
+    cases = {
+        "prefix": [rng.choice(names)[:3] for _ in range(queries)],
+        "typo": [typo(rng.choice(names), rng) for _ in range(queries)],
+    }
+    for label, terms in cases.items():
+        timings = []
+        for term in terms:
+            start = time.perf_counter()
+            index.search(term, 10)
+            timings.append((time.perf_counter() - start) * 1000)
+        timings.sort()
+        print(f"  {label:<7} p50 {timings[len(timings) // 2]:6.3f} ms   p99 {timings[int(len(timings) * 0.99)]:6.3f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--vocabulary", type=int, default=50_000)
+    parser.add_argument("--syllables", type=int, default=200)
+    parser.add_argument("--queries", type=int, default=500)
+    args = parser.parse_args()
+    run(args.vocabulary, args.syllables, args.queries)
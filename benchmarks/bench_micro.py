@@ -0,0 +1,77 @@
+"""pytest-benchmark micro-benchmarks for the hot helpers.
+
+The file name keeps it out of the default test run; pass it explicitly:
+
+    python -m pytest benchmarks/bench_micro.py --benchmark-save=baseline
+    python -m pytest benchmarks/bench_micro.py --benchmark-compare=0001
+"""
+import asyncio
+import os
+from datetime import timedelta
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+import pytest
+from sqlalchemy.dialects import postgresql, sqlite
+
+from database.auth import create_access_token, get_current_user, token_cache
+from database.normalization import normalize_ingredient_name
+from database.recipes import (recipe_list_query, recipes_with_all_ingredients_query, coverage_query,
+                              top_k_by_coverage, with_ingredients_option)
+from database.utils import format_ingredient_name
+
+NAMES = ["Tomate", "Cebolla morada", "Jalapeño", "Champiñón", "Aceite de oliva virgen", "Crème fraîche", "Sal"]
+
+
+def test_format_ingredient_name_cached(benchmark):
+    benchmark(lambda: [format_ingredient_name(name) for name in NAMES])
+
+
+def test_format_ingredient_name_uncached(benchmark):
+    def run():
+        normalize_ingredient_name.cache_clear()
+        return [format_ingredient_name(name) for name in NAMES]
+    benchmark(run)
+
+
+def test_create_access_token(benchmark):
+    benchmark(create_access_token, "tester", 1, "tester@example.com", False)
+
+
+@pytest.fixture
+def event_loop_runner():
+    loop = asyncio.new_event_loop()
+    yield loop.run_until_complete
+    loop.close()
+
+
+def test_get_current_user_decode(benchmark, event_loop_runner):
+    token = create_access_token("tester", 1, "tester@example.com", False)
+
+    def run():
+        token_cache.clear()
+        return event_loop_runner(get_current_user(token))
+    assert benchmark(run).username == "tester"
+
+
+def test_get_current_user_cached(benchmark, event_loop_runner):
+    token = create_access_token("tester", 1, "tester@example.com", False)
+    event_loop_runner(get_current_user(token))
+    assert benchmark(lambda: event_loop_runner(get_current_user(token))).username == "tester"
+
+
+@pytest.mark.parametrize("dialect", [sqlite.dialect(), postgresql.dialect()], ids=["sqlite", "postgresql"])
+@pytest.mark.parametrize("builder", [
+    lambda: recipe_list_query(1000, "Easy", "Main", timedelta(minutes=30)),
+    lambda: with_ingredients_option(recipe_list_query(1000), True),
+    lambda: recipes_with_all_ingredients_query([1, 2, 3, 4]),
+    lambda: coverage_query(list(range(1, 16))),
+], ids=["recipe_list", "recipe_list_with_ingredients", "with_all_ingredients", "coverage"])
+def test_query_builders(benchmark, builder, dialect):
+    # Building plus compiling, which is what each request pays before hitting the database
+    benchmark(lambda: str(builder().compile(dialect=dialect)))
+
+
+def test_top_k_by_coverage(benchmark):
+    rows = [(recipe_id, recipe_id % 7 + 1, 8) for recipe_id in range(1, 50_001)]
+    benchmark(top_k_by_coverage, rows, 20)
@@ -0,0 +1,45 @@
+"""Ingredient-name normalization, previous regex implementation vs database.normalization.
+
+    python -m benchmarks.bench_normalization
+"""
+import random
+import re
+import timeit
+
+from database.normalization import normalize_ingredient_name, normalize_ingredient_names
+
+
+def legacy_format_ingredient_name(ingredient: str) -> str:
+    return re.sub(r'[áéíóúÁÉÍÓÚ ]',
+                  lambda m: {'á': 'a', 'é': 'e', 'í': 'i', 'ó': 'o', 'ú': 'u',
+                             'Á': 'A', 'É': 'E', 'Í': 'I', 'Ó': 'O', 'Ú': 'U', " ": ""}[m.group()],
+                  ingredient.lower().strip())
+
+
+WORDS = ["Tomate", "Cebolla", "Ajo", "Pimiento", "Azúcar", "Limón", "Jalapeño", "Champiñón",
+         "Aceite de oliva", "Pan rallado", "Crème fraîche", "Ñora", "Pimentón dulce", "Sal"]
+
+
+def main(size: int = 1000, number: int = 200):
+    rng = random.Random(0)
+    names = [" ".join(rng.sample(WORDS, rng.randint(1, 3))) for _ in range(size)]
+    unique = len(set(names))
+
+    def memo_cold():
+        normalize_ingredient_name.cache_clear()
+        [normalize_ingredient_name(name) for name in names]
+
+    cases = {
+        "legacy re.sub": lambda: [legacy_format_ingredient_name(name) for name in names],
+        "translate (cold memo)": memo_cold,
+        "translate (warm memo)": lambda: [normalize_ingredient_name(name) for name in names],
+        "batch": lambda: normalize_ingredient_names(names),
+    }
+    print(f"{size} names ({unique} distinct), microseconds per name")
+    for label, func in cases.items():
+        seconds = min(timeit.repeat(func, number=number, repeat=3)) / number
+        print(f"  {label:<24}{seconds / size * 1e6:8.3f}")
+
+
+if __name__ == "__main__":
+    main()
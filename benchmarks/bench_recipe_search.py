@@ -0,0 +1,92 @@
+"""Full-text recipe search against a LIKE scan over the same recipes.
+
+    python -m benchmarks.bench_recipe_search --recipes 500000
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+from datetime import timedelta
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from sqlalchemy import or_
+from sqlalchemy.pool import NullPool
+from sqlmodel import SQLModel, create_engine, select, text
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from models.recipes import Recipe
+from models.auth import User  # noqa: F401 (recipe.owner_id foreign key)
+from database.database import create_db_engine
+from database.normalization import fold_accents
+from database.recipe_search import search_recipe_ids
+from benchmarks.bench_ingredient_search import vocabulary
+
+BATCH = 10_000
+
+
+def populate(engine, recipes: int, words: list[str], seed: int = 0):
+    rng = random.Random(seed)
+    with engine.begin() as connection:
+        for start in range(1, recipes + 1, BATCH):
+            rows = [{"id": r, "name": " ".join(rng.choices(words, k=3)), "difficulty": "easy",
+                     "recipe_type": rng.choice(["main", "dessert", "soup"]),
+                     "steps": " ".join(rng.choices(words, k=25)), "duration": timedelta(minutes=30)}
+                    for r in range(start, min(start + BATCH, recipes + 1))]
+            connection.execute(Recipe.__table__.insert(), rows)
+            connection.execute(text("INSERT INTO recipe_fts (rowid, name, recipe_type, steps) "
+                                    "VALUES (:id, :name, :recipe_type, :steps)"),
+                               [{"id": row["id"], "name": fold_accents(row["name"]),
+                                 "recipe_type": row["recipe_type"], "steps": fold_accents(row["steps"])}
+                                for row in rows])
+
+
+async def query(label: str, term: str, session: AsyncSession):
+    if label == "fts":
+        return await search_recipe_ids(term, 20, 0, session)
+    pattern = f"%{term}%"
+    return (await session.exec(select(Recipe.id).where(or_(Recipe.name.like(pattern), Recipe.steps.like(pattern)))
+                               .limit(20))).all()
+
+
+async def measure(database_url: str, cases: dict[str, list[str]]):
+    engine = create_db_engine(database_url, poolclass=NullPool)
+    async with AsyncSession(engine) as session:
+        for case, terms in cases.items():
+            for label in ("fts", "like"):
+                timings = []
+                for term in terms:
+                    start = time.perf_counter()
+                    await query(label, term, session)
+                    timings.append((time.perf_counter() - start) * 1000)
+                timings.sort()
+                print(f"  {case:<5} {label:<5} p50 {timings[len(timings) // 2]:8.2f} ms"
+                      f"   p99 {timings[int(len(timings) * 0.99)]:8.2f} ms")
+    await engine.dispose()
+
+
+def run(recipes: int, queries: int):
+    words = vocabulary(5000)
+    with tempfile.TemporaryDirectory() as directory:
+        database_url = f"sqlite:///{os.path.join(directory, 'bench.db')}"
+        engine = create_engine(database_url)
+        SQLModel.metadata.create_all(engine)
+        start = time.perf_counter()
+        populate(engine, recipes, words)
+        engine.dispose()
+        print(f"{recipes} recipes, populate and index {time.perf_counter() - start:.1f} s")
+        # On a hit LIKE stops after 20 rows in table order and ranks nothing, while FTS ranks
+        # every match; on a miss LIKE has to scan the whole table
+        rng = random.Random(1)
+        hits = [rng.choice(words) for _ in range(queries)]
+        asyncio.run(measure(database_url, {"hit": hits, "miss": [word + "xq" for word in hits]}))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--recipes", type=int, default=500_000)
+    parser.add_argument("--queries", type=int, default=50)
+    args = parser.parse_args()
+    run(args.recipes, args.queries)
@@ -0,0 +1,89 @@
+"""Reader throughput while recipes are being written, with and without the SQLite profile.
+
+Each profile runs in its own process on a fresh database from benchmarks.datagen,
+because the settings are read at import time and WAL mode sticks to the file:
+
+    python -m benchmarks.bench_sqlite_concurrency --readers 16 --writers 4 --duration 5
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+PROFILES = {"legacy": "false", "tuned": "true"}
+
+
+async def child(readers: int, writers: int, duration: float, recipes: int) -> dict:
+    import httpx
+    from main import app, on_startup
+    from database.auth import create_access_token
+    from database.recipes import encode_cursor
+    from benchmarks.load_test import percentile
+
+    await on_startup()
+    headers = {"Authorization": f"Bearer {create_access_token('user1', 1, 'user1@example.com', True)}"}
+    results = {"read": [], "write": [], "read_errors": 0, "write_errors": 0}
+    deadline = time.perf_counter() + duration
+
+    async def reader(client, rng):
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            response = await client.get("/recipes/", params={"limit": 20, "difficulty": "Easy",
+                                                             "cursor": encode_cursor(rng.randint(1, recipes))})
+            results["read"].append(time.perf_counter() - start)
+            results["read_errors"] += response.status_code >= 500
+
+    async def writer(client, rng, worker):
+        i = 0
+        while time.perf_counter() < deadline:
+            i += 1
+            recipe = {"name": f"bench {worker}-{i}", "difficulty": "Easy", "recipe_type": "Main", "steps": "Cook",
+                      "duration": "00:20:00", "ingredients": [{"name": f"benchingredient{rng.randint(1, 50)}"}]}
+            start = time.perf_counter()
+            response = await client.post("/recipes/create_recipe", headers=headers, json=recipe)
+            results["write"].append(time.perf_counter() - start)
+            results["write_errors"] += response.status_code >= 500
+
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        await asyncio.gather(*(reader(client, random.Random(i)) for i in range(readers)),
+                             *(writer(client, random.Random(-i), i) for i in range(writers)))
+    read, write = sorted(results["read"]), sorted(results["write"])
+    return {"read_rps": len(read) / duration, "read_p99_ms": percentile(read, 0.99) * 1000 if read else None,
+            "read_errors": results["read_errors"], "write_rps": len(write) / duration,
+            "write_p99_ms": percentile(write, 0.99) * 1000 if write else None, "write_errors": results["write_errors"]}
+
+
+def run(readers: int, writers: int, duration: float, recipes: int):
+    from benchmarks.datagen import Scale, create_database
+
+    for profile, tuning in PROFILES.items():
+        path = os.path.join(tempfile.mkdtemp(), "concurrency.db")
+        create_database(f"sqlite:///{path}", Scale(recipes=recipes))
+        env = os.environ | {"DATABASE_URL": f"sqlite:///{path}", "SQLITE_TUNING": tuning}
+        output = subprocess.run([sys.executable, "-m", "benchmarks.bench_sqlite_concurrency", "--child",
+                                 "--readers", str(readers), "--writers", str(writers), "--duration", str(duration),
+                                 "--recipes", str(recipes)], env=env, capture_output=True, text=True, check=True)
+        stats = json.loads(output.stdout.strip().splitlines()[-1])
+        print(f"{profile:<7} reads {stats['read_rps']:8.1f} req/s  p99 {stats['read_p99_ms'] or 0:8.1f} ms  "
+              f"errors {stats['read_errors']:>5}   writes {stats['write_rps']:7.1f} req/s  "
+              f"p99 {stats['write_p99_ms'] or 0:8.1f} ms  errors {stats['write_errors']:>5}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--readers", type=int, default=16)
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--recipes", type=int, default=20_000)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        print(json.dumps(asyncio.run(child(args.readers, args.writers, args.duration, args.recipes))))
+    else:
+        run(args.readers, args.writers, args.duration, args.recipes)
@@ -0,0 +1,42 @@
+"""Time the ranked pantry search (index path and SQL path) at a given scale.
+
+    python -m benchmarks.bench_what_can_i_cook --recipes 100000
+"""
+import argparse
+import random
+import time
+
+from sqlmodel import SQLModel, Session, create_engine, select
+
+from models.recipes import RecipeIngredientLink
+from database.recipes import coverage_query, top_k_by_coverage
+from database.ingredient_index import IngredientIndex
+from benchmarks.bench_ingredient_index import INGREDIENTS, INGREDIENTS_PER_RECIPE, populate
+
+
+def run(recipes: int, pantry_size: int, repeat: int):
+    engine = create_engine("sqlite://")
+    SQLModel.metadata.create_all(engine)
+    populate(engine, recipes * INGREDIENTS_PER_RECIPE)
+    rng = random.Random(1)
+    pantries = [rng.sample(range(1, INGREDIENTS + 1), pantry_size) for _ in range(repeat)]
+
+    with Session(engine) as session:
+        index = IngredientIndex()
+        index.build(session.exec(select(RecipeIngredientLink.recipe_id, RecipeIngredientLink.ingredient_id)))
+        for name, coverage in (("index", index.coverage),
+                               ("sql", lambda ids: session.exec(coverage_query(ids)).all())):
+            start = time.perf_counter()
+            for pantry in pantries:
+                top_k_by_coverage(coverage(pantry), 20)
+            ms = (time.perf_counter() - start) / repeat * 1000
+            print(f"{recipes:>8} recipes  pantry {pantry_size:>3}  {name:<5} {ms:8.3f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--recipes", type=int, default=100_000)
+    parser.add_argument("--pantry", type=int, default=15)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    run(args.recipes, args.pantry, args.repeat)
@@ -0,0 +1,111 @@
+"""Synthetic users, ingredients, recipes and recipe-ingredient links at a given scale.
+
+    python -m benchmarks.datagen bench.db --users 100 --ingredients 2000 --recipes 100000
+
+The same seed always produces the same rows, so runs against a generated
+database can be compared. Ingredient popularity is skewed (a few appear in
+most recipes, like salt or oil) and recipe text is made of pseudo-words so the
+full-text index has realistic postings.
+"""
+import argparse
+import random
+import time
+from dataclasses import dataclass
+from datetime import timedelta
+
+from passlib.hash import bcrypt
+from sqlmodel import SQLModel, create_engine, text
+
+from models.auth import User
+from models.recipes import Recipe, Ingredient, RecipeIngredientLink, RecipeFacet
+# Only modules that do not read the settings, so importers can still choose DATABASE_URL
+from database.normalization import fold_accents
+from database.facets import facet_queries
+from database import recipe_search  # noqa: F401 (creates recipe_fts with the recipe table)
+from database.schema import stamp_head
+from benchmarks.bench_ingredient_search import vocabulary
+
+BATCH = 10_000
+DIFFICULTIES = ["Easy", "Medium", "Hard"]
+RECIPE_TYPES = ["Main", "Dessert", "Soup", "Salad", "Breakfast"]
+# Every user logs in with this password; it is hashed once, one hash per user would dominate the run
+PASSWORD = "password"
+
+
+@dataclass
+class Scale:
+    users: int = 100
+    ingredients: int = 2000
+    recipes: int = 10_000
+    ingredients_per_recipe: int = 8
+
+
+def ingredient_names(count: int, seed: int) -> list[str]:
+    # Normalized form, as IngredientBase.validate_name would store them
+    return vocabulary(count, syllables=200, seed=seed)
+
+
+def generate(engine, scale: Scale, seed: int = 0):
+    rng = random.Random(seed)
+    words = vocabulary(5000, seed=seed + 1)
+    weights = [1 / (rank + 1) for rank in range(scale.ingredients)]
+    ingredient_ids = range(1, scale.ingredients + 1)
+    fts = engine.dialect.name == "sqlite"
+    password_hash = bcrypt.hash(PASSWORD)
+
+    with engine.begin() as connection:
+        connection.execute(User.__table__.insert(), [
+            {"id": u, "name": f"User{u}", "surname": "Bench", "username": f"user{u}", "email": f"user{u}@example.com",
+             "hashed_password": password_hash, "is_active": True, "is_superuser": u == 1}
+            for u in range(1, scale.users + 1)])
+        connection.execute(Ingredient.__table__.insert(), [
+            {"id": i, "name": name} for i, name in enumerate(ingredient_names(scale.ingredients, seed), 1)])
+
+        for start in range(1, scale.recipes + 1, BATCH):
+            recipes, links = [], []
+            for recipe_id in range(start, min(start + BATCH, scale.recipes + 1)):
+                recipes.append({"id": recipe_id, "name": f"{' '.join(rng.choices(words, k=3))} {recipe_id}",
+                                "difficulty": rng.choice(DIFFICULTIES), "recipe_type": rng.choice(RECIPE_TYPES),
+                                "steps": " ".join(rng.choices(words, k=25))[:200],
+                                "duration": timedelta(minutes=rng.randint(5, 180)),
+                                "owner_id": rng.randint(1, scale.users) if scale.users else None})
+                for ingredient_id in set(rng.choices(ingredient_ids, weights, k=scale.ingredients_per_recipe)):
+                    links.append({"recipe_id": recipe_id, "ingredient_id": ingredient_id})
+            connection.execute(Recipe.__table__.insert(), recipes)
+            connection.execute(RecipeIngredientLink.__table__.insert(), links)
+            if fts:
+                connection.execute(text("INSERT INTO recipe_fts (rowid, name, recipe_type, steps) "
+                                        "VALUES (:id, :name, :recipe_type, :steps)"),
+                                   [{"id": r["id"], "name": fold_accents(r["name"]),
+                                     "recipe_type": fold_accents(r["recipe_type"]), "steps": fold_accents(r["steps"])}
+                                    for r in recipes])
+        # What rebuild-facets would compute, so facet reads are measured against real counts
+        for facet, query in facet_queries():
+            rows = [{"facet": facet, "value": str(value), "count": count} for value, count in connection.execute(query)
+                    if count]
+            if rows:
+                connection.execute(RecipeFacet.__table__.insert(), rows)
+
+
+def create_database(database_url: str, scale: Scale, seed: int = 0):
+    engine = create_engine(database_url)
+    SQLModel.metadata.create_all(engine)
+    with engine.begin() as connection:
+        stamp_head(connection)
+    generate(engine, scale, seed)
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", help="SQLite file to create")
+    parser.add_argument("--users", type=int, default=Scale.users)
+    parser.add_argument("--ingredients", type=int, default=Scale.ingredients)
+    parser.add_argument("--recipes", type=int, default=Scale.recipes)
+    parser.add_argument("--ingredients-per-recipe", type=int, default=Scale.ingredients_per_recipe)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    start = time.perf_counter()
+    create_database(f"sqlite:///{args.path}", Scale(args.users, args.ingredients, args.recipes,
+                                                    args.ingredients_per_recipe), args.seed)
+    print(f"{args.path}: {args.recipes} recipes in {time.perf_counter() - start:.1f} s")
@@ -0,0 +1,118 @@
+"""Latency percentiles and throughput of the main endpoints under concurrent load.
+
+Seeds a SQLite file with benchmarks.datagen, then drives the app with N
+concurrent clients, either in-process through httpx's ASGI transport or
+against a running server. Each client picks endpoints from a fixed weighted
+mix with its own seeded RNG, so two runs send the same kind of traffic:
+
+    python -m benchmarks.load_test --concurrency 1 8 32 --json before.json
+    python -m benchmarks.load_test --url http://127.0.0.1:8000 --concurrency 32
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import tempfile
+import time
+
+import httpx
+
+from benchmarks.datagen import Scale, create_database, ingredient_names
+
+SCALE = Scale(users=100, ingredients=2000, recipes=5000)
+
+
+def percentile(sorted_values: list[float], fraction: float) -> float:
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+def request_mix(rng: random.Random, scale: Scale, names: list[str]):
+    # (weight, endpoint label, function sending one request)
+    popular = names[:20]
+    return [
+        (30, "GET /recipes/{id}", lambda c: c.get(f"/recipes/{rng.randint(1, scale.recipes)}")),
+        (15, "GET /recipes/ingredient_by_id/{id}",
+         lambda c: c.get(f"/recipes/ingredient_by_id/{rng.randint(1, scale.ingredients)}")),
+        (15, "GET /recipes/", lambda c: c.get("/recipes/", params={"limit": 20, "difficulty": "Easy"})),
+        (10, "POST /recipes/recipe_by_ingredients",
+         lambda c: c.post("/recipes/recipe_by_ingredients", json=[{"name": n} for n in rng.sample(popular, 2)])),
+        (10, "POST /recipes/what_can_i_cook",
+         lambda c: c.post("/recipes/what_can_i_cook", json=[{"name": n} for n in rng.sample(names[:200], 10)])),
+        (10, "GET /recipes/ingredient_search",
+         lambda c: c.get("/recipes/ingredient_search", params={"q": rng.choice(names)[:3]})),
+        (10, "GET /recipes/search", lambda c: c.get("/recipes/search", params={"q": rng.choice(names)[:4]})),
+    ]
+
+
+async def drive(client: httpx.AsyncClient, concurrency: int, duration: float, scale: Scale) -> dict:
+    names = ingredient_names(scale.ingredients, seed=0)
+    latencies: dict[str, list[float]] = {}
+    errors: dict[str, int] = {}
+    deadline = time.perf_counter() + duration
+
+    async def worker(seed: int):
+        rng = random.Random(seed)
+        mix = request_mix(rng, scale, names)
+        weights = [weight for weight, _, _ in mix]
+        while time.perf_counter() < deadline:
+            _, label, send = rng.choices(mix, weights)[0]
+            start = time.perf_counter()
+            response = await send(client)
+            latencies.setdefault(label, []).append(time.perf_counter() - start)
+            if response.status_code >= 500:
+                errors[label] = errors.get(label, 0) + 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    endpoints = {}
+    for label, values in sorted(latencies.items()):
+        values.sort()
+        endpoints[label] = {"requests": len(values), "errors": errors.get(label, 0),
+                            "rps": len(values) / elapsed,
+                            "p50_ms": percentile(values, 0.50) * 1000, "p95_ms": percentile(values, 0.95) * 1000,
+                            "p99_ms": percentile(values, 0.99) * 1000}
+    total = sum(len(values) for values in latencies.values())
+    return {"concurrency": concurrency, "duration": elapsed, "requests": total, "rps": total / elapsed,
+            "errors": sum(errors.values()), "endpoints": endpoints}
+
+
+def print_run(run: dict):
+    print(f"concurrency {run['concurrency']:>4}  {run['rps']:9.1f} req/s  errors {run['errors']}")
+    for label, stats in run["endpoints"].items():
+        print(f"  {label:<38} {stats['rps']:8.1f} req/s  p50 {stats['p50_ms']:7.1f}  "
+              f"p95 {stats['p95_ms']:7.1f}  p99 {stats['p99_ms']:7.1f} ms  errors {stats['errors']}")
+
+
+async def main(url: str | None, concurrencies: list[int], duration: float, json_path: str | None):
+    if url:
+        client = httpx.AsyncClient(base_url=url)
+    else:
+        from main import app, on_startup
+        await on_startup()
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+    runs = []
+    async with client:
+        for concurrency in concurrencies:
+            run = await drive(client, concurrency, duration, SCALE)
+            print_run(run)
+            runs.append(run)
+    if json_path:
+        with open(json_path, "w") as file:
+            json.dump({"target": url or "in-process", "scale": SCALE.__dict__, "runs": runs}, file, indent=2)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--json", dest="json_path", help="Write the results to this file")
+    args = parser.parse_args()
+    if not args.url:
+        path = os.path.join(tempfile.mkdtemp(), "load.db")
+        os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+        create_database(os.environ["DATABASE_URL"], SCALE)
+    asyncio.run(main(args.url, args.concurrency, args.duration, args.json_path))
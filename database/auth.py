@@ -4,42 +4,129 @@ from fastapi.security import OAuth2PasswordBearer
 from datetime import datetime, timedelta, timezone
 from typing import Annotated
 from jose import jwt, JWTError
+import hashlib
+import time
+from collections import OrderedDict
 from .core import settings
+from .hashing import password_pool
+from .cache import TTLCache
+from .metrics import jwt_seconds
 from schemas.auth import Token
 
-bcrypt_context = CryptContext(schemes=['bcrypt'], deprecated='auto')
+# min_rounds makes hashes created with fewer rounds count as deprecated, so they get upgraded on login
+bcrypt_context = CryptContext(schemes=['bcrypt'], deprecated='auto',
+                              bcrypt__rounds=settings.BCRYPT_ROUNDS, bcrypt__min_rounds=settings.BCRYPT_ROUNDS)
+
+async def hash_password(password: str) -> str:
+    return await password_pool.run(bcrypt_context.hash, password)
+
+async def verify_password(password: str, hashed_password: str) -> tuple[bool, str | None]:
+    return await password_pool.run(bcrypt_context.verify_and_update, password, hashed_password)
 
 # SQLModel
 
-from sqlmodel import Session, select
-from models.auth import User
-from schemas.auth import UserDataForJWT
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import select, or_
+from sqlmodel.ext.asyncio.session import AsyncSession
+from models.auth import User, UserCreate, UserProvision
+from schemas.auth import UserDataForJWT, UserProvisionReport
+from .bulk_import import insert_ignore
 
 oauth2_bearer = OAuth2PasswordBearer(tokenUrl="auth/login")
 
-# I definitely need optimise this shitty func
-def user_existence_verify(username: str, email: str, session: Session):
-    user_username = session.exec(select(User).where(User.username == username)).first()
-    user_email = session.exec(select(User).where(User.email == email)).first()
-    
-    if user_username and user_email:
-        raise HTTPException(status_code=status.HTTP_409_CONFLICT,
-                            detail=f"The username \'{username}\' and email \'{email}\' are already taken. Please choose another")
-    if user_username:
-        raise HTTPException(status_code=status.HTTP_409_CONFLICT,
-                            detail=f"The username \'{username}\' is already taken. Please choose another")
-    if user_email:
+# Validated tokens, keyed by their sha256 digest and tagged with the user id
+token_cache = TTLCache(maxsize=settings.TOKEN_CACHE_SIZE)
+# user id -> epoch time; tokens of that user issued up to then are rejected. Oldest first,
+# and dropped once every token they could reject has expired anyway
+revoked_before: OrderedDict[int, float] = OrderedDict()
+
+def revoke_user_tokens(user_id: int):
+    # Call on logout, password change or superuser demotion
+    now = time.time()
+    revoked_before.pop(user_id, None)
+    revoked_before[user_id] = now
+    while next(iter(revoked_before.values())) < now - settings.ACCESS_TOKEN_EXPIRES * 60:
+        revoked_before.popitem(last=False)
+    token_cache.invalidate_tag(user_id)
+
+# Stored instead of a hash for accounts that cannot log in with a password
+UNUSABLE_PASSWORD = '!'
+
+def user_conflict(username: str, email: str, username_taken: bool, email_taken: bool) -> HTTPException:
+    if username_taken and email_taken:
+        return HTTPException(status_code=status.HTTP_409_CONFLICT,
+                             detail=f"The username \'{username}\' and email \'{email}\' are already taken. Please choose another")
+    if username_taken:
+        return HTTPException(status_code=status.HTTP_409_CONFLICT,
+                             detail=f"The username \'{username}\' is already taken. Please choose another")
+    return HTTPException(status_code=status.HTTP_409_CONFLICT,
+                         detail=f"The email \'{email}\' is already taken. Please choose another")
+
+async def user_existence_verify(username: str, email: str, session: AsyncSession):
+    # One lookup served by the unique indexes on username and email
+    rows = (await session.exec(select(User.username, User.email)
+                               .where(or_(User.username == username, User.email == email)).limit(2))).all()
+    if rows:
+        raise user_conflict(username, email, username_taken=any(row.username == username for row in rows),
+                            email_taken=any(row.email == email for row in rows))
+
+async def create_user(user_data: UserCreate, session: AsyncSession) -> User:
+    # The lookup spares the bcrypt work for names already taken; the unique
+    # indexes settle the race between two signups that both pass it
+    await user_existence_verify(user_data.username, user_data.email, session)
+    # Nothing held while bcrypt runs: on SQLite this session's connection is the single writer
+    await session.rollback()
+    new_user = User(name=user_data.name, surname=user_data.surname, username=user_data.username,
+                    email=user_data.email, hashed_password=await hash_password(user_data.password))
+    session.add(new_user)
+    try:
+        await session.commit()
+    except IntegrityError:
+        await session.rollback()
+        await user_existence_verify(user_data.username, user_data.email, session)
         raise HTTPException(status_code=status.HTTP_409_CONFLICT,
-                            detail=f"The email \'{email}\' is already taken. Please choose another")
-    return
+                            detail="The username or email is already taken. Please choose another")
+    return new_user
+
+async def provision_users(users: list[UserProvision], session: AsyncSession,
+                          chunk_size: int = 500) -> UserProvisionReport:
+    # Existing usernames or emails are skipped rather than failing the whole call, and so are
+    # repeats of a username within the call: only its first entry is inserted
+    unique, repeated = {}, []
+    for user in users:
+        if user.username in unique:
+            repeated.append(user.username)
+        else:
+            unique[user.username] = user
+    users = list(unique.values())
+    created = set()
+    for start in range(0, len(users), chunk_size):
+        rows = [{"name": user.name, "surname": user.surname, "username": user.username, "email": user.email,
+                 "hashed_password": UNUSABLE_PASSWORD, "is_active": True, "is_superuser": False}
+                for user in users[start:start + chunk_size]]
+        result = await session.exec(insert_ignore(session, User).returning(User.username), params=rows)
+        created.update(result.scalars().all())
+    await session.commit()
+    return UserProvisionReport(created=len(created),
+                               skipped=[user.username for user in users if user.username not in created] + repeated)
 
-def authenticate_user(username: str, password: str, session: Session)-> User:
-    user = session.exec(select(User).where(User.username == username)).first()
+async def authenticate_user(username: str, password: str, session: AsyncSession)-> User:
+    user = (await session.exec(select(User).where(User.username == username))).first()
     if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="No user with this username")
-    if not bcrypt_context.verify(password, user.hashed_password):
+    user_data = user.model_dump()
+    # End the lookup's transaction before bcrypt, so logins do not hold the SQLite writer connection
+    await session.rollback()
+    if user_data["hashed_password"] == UNUSABLE_PASSWORD:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Incorrect password")
+    verified, new_hash = await verify_password(password, user_data["hashed_password"])
+    if not verified:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Incorrect password")
-    return dict(user)
+    if new_hash:
+        await session.exec(update(User).where(User.id == user_data["id"]).values(hashed_password=new_hash))
+        await session.commit()
+    return user_data
 
 def create_access_token(username: str, user_id: str, email: str, is_superuser: bool,
                                  expires_delta: int = settings.ACCESS_TOKEN_EXPIRES):
@@ -48,23 +135,38 @@ def create_access_token(username: str, user_id: str, email: str, is_superuser: b
                  "email": email,
                  "is_superuser": is_superuser}
     expire_time = datetime.now(timezone.utc) + timedelta(minutes=expires_delta)
-    to_encode.update({"exp": expire_time})
+    # Sub-second iat, so a login right after a logout is not caught by the revocation
+    to_encode.update({"exp": expire_time, "iat": time.time()})
+    start = time.perf_counter()
     token = jwt.encode(claims=to_encode, key=settings.SECRET, algorithm=settings.ALGORITHM)
+    jwt_seconds.observe(time.perf_counter() - start, "encode")
     return token
 
 async def get_current_user(token: Annotated[str, Depends(oauth2_bearer)]):
+    token_key = hashlib.sha256(token.encode()).digest()
+    cached_user = token_cache.get(token_key)
+    if cached_user is not None:
+        return cached_user
     try:
-        payload = jwt.decode(token, key=settings.SECRET, algorithms=[settings.ALGORITHM])
+        start = time.perf_counter()
+        try:
+            payload = jwt.decode(token, key=settings.SECRET, algorithms=[settings.ALGORITHM])
+        finally:
+            jwt_seconds.observe(time.perf_counter() - start, "decode")
         if payload.get("sub") is None or payload.get("user_id") is None:
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,
                                 detail='Could not validate user.')
+        if payload.get("iat", 0) <= revoked_before.get(payload.get("user_id"), -1):
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token has been revoked")
         user_data_dict = {
             "id": payload.get("user_id"),
             "email": payload.get("email"),
             "username": payload.get("sub"),
             "is_superuser": payload.get("is_superuser")
             }
-        return UserDataForJWT.model_validate(user_data_dict)
+        user = UserDataForJWT.model_validate(user_data_dict)
+        token_cache.set(token_key, user, expires_at=payload["exp"], tags=(user.id,))
+        return user
     except JWTError:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Could not validate token")
     
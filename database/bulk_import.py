@@ -0,0 +1,139 @@
+import json
+from typing import AsyncIterable, AsyncIterator
+from pydantic import ValidationError
+from sqlalchemy import insert
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from models.recipes import (Recipe, Ingredient, RecipeIngredientLink, RecipeCreate,
+                           RecipeImportError, RecipeImportReport)
+from .ingredient_index import ingredient_index
+from .ingredient_search import ingredient_search_index
+from .recipe_search import index_documents
+from .facets import update_facets, recipe_facet_values
+from .meal_plans import invalidate_shopping_lists
+from .index_sync import bump_index_version, catch_up
+from .recipes import IN_CHUNK_SIZE
+
+# Only the first errors are kept in the report so memory does not grow with the file
+MAX_REPORTED_ERRORS = 100
+
+
+def insert_ignore(session: AsyncSession, model):
+    # INSERT ... ON CONFLICT DO NOTHING where the dialect supports it
+    dialect = session.bind.dialect.name
+    if dialect == 'sqlite':
+        return sqlite.insert(model).on_conflict_do_nothing()
+    if dialect == 'postgresql':
+        return postgresql.insert(model).on_conflict_do_nothing()
+    return insert(model)
+
+
+async def iter_lines(chunks: AsyncIterable[bytes]) -> AsyncIterator[bytes]:
+    buffer = b''
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b'\n')
+        for line in lines:
+            yield line
+    if buffer:
+        yield buffer
+
+
+async def resolve_ingredients(names: set[str], session: AsyncSession) -> tuple[dict[str, int], list[str]]:
+    # name -> id for every name, plus the names that had to be inserted
+    names = list(names)
+    ingredient_ids = {}
+    for start in range(0, len(names), IN_CHUNK_SIZE):
+        chunk = names[start:start + IN_CHUNK_SIZE]
+        ingredient_ids.update((await session.exec(
+            select(Ingredient.name, Ingredient.id).where(Ingredient.name.in_(chunk)))).all())
+    missing = [name for name in names if name not in ingredient_ids]
+    if missing:
+        await session.exec(insert_ignore(session, Ingredient), params=[{"name": name} for name in missing])
+        for start in range(0, len(missing), IN_CHUNK_SIZE):
+            chunk = missing[start:start + IN_CHUNK_SIZE]
+            ingredient_ids.update((await session.exec(
+                select(Ingredient.name, Ingredient.id).where(Ingredient.name.in_(chunk)))).all())
+    return ingredient_ids, missing
+
+
+async def insert_recipe_batch(batch: list[RecipeCreate], owner_id: int | None,
+                              session: AsyncSession) -> tuple[list[tuple[int, list[int]]], list[tuple[int, str]]]:
+    # Returns (recipe id, ingredient ids) per recipe and (id, name) of the new ingredients
+    # RecipeCreate validation has already normalized the ingredient names
+    names_per_recipe = [list(dict.fromkeys(i.name for i in recipe.ingredients)) for recipe in batch]
+    ingredient_ids, new_names = await resolve_ingredients({n for names in names_per_recipe for n in names}, session)
+
+    rows = [{"name": recipe.name, "difficulty": recipe.difficulty, "recipe_type": recipe.recipe_type,
+             "steps": recipe.steps, "duration": recipe.duration, "owner_id": owner_id} for recipe in batch]
+    result = await session.exec(insert(Recipe).returning(Recipe.id, sort_by_parameter_order=True), params=rows)
+    recipe_ids = result.scalars().all()
+    await index_documents([row | {"id": recipe_id} for row, recipe_id in zip(rows, recipe_ids)], session)
+
+    recipes = [(recipe_id, [ingredient_ids[name] for name in names])
+               for recipe_id, names in zip(recipe_ids, names_per_recipe)]
+    links = [{"recipe_id": recipe_id, "ingredient_id": ingredient_id}
+             for recipe_id, ids in recipes for ingredient_id in ids]
+    if links:
+        await session.exec(insert(RecipeIngredientLink), params=links)
+    await update_facets(session, added=[value for recipe, (_, ids) in zip(batch, recipes)
+                                        for value in recipe_facet_values(recipe, ids)])
+    return recipes, [(ingredient_ids[name], name) for name in new_names]
+
+
+async def import_recipes(lines: AsyncIterable[bytes | str], session: AsyncSession,
+                         owner_id: int | None = None, chunk_size: int = 500) -> RecipeImportReport:
+    report = RecipeImportReport()
+    batch = []
+    first_line = last_line = 0
+
+    def add_error(line: int, message: str, failed: int = 1):
+        report.failed += failed
+        if len(report.errors) < MAX_REPORTED_ERRORS:
+            report.errors.append(RecipeImportError(line=line, error=message))
+
+    async def flush():
+        # A chunk the database rejects is rolled back and reported as one error, at its first line
+        try:
+            recipes, new_ingredients = await insert_recipe_batch(batch, owner_id, session)
+            version = await bump_index_version(ingredient_index.name, session)
+            if new_ingredients:
+                search_version = await bump_index_version(ingredient_search_index.name, session)
+            await session.commit()
+        except DBAPIError as e:
+            await session.rollback()
+            add_error(first_line, f"lines {first_line}-{last_line}: {e.orig}", failed=len(batch))
+            batch.clear()
+            return
+        # In manage.py the indexes are cold: the servers' copies see the bumped versions instead
+        if catch_up(ingredient_index, version):
+            for recipe_id, ingredient_ids in recipes:
+                ingredient_index.add_recipe(recipe_id, ingredient_ids)
+        invalidate_shopping_lists(recipe_ids=[recipe_id for recipe_id, _ in recipes])
+        if new_ingredients and catch_up(ingredient_search_index, search_version):
+            for ingredient_id, name in new_ingredients:
+                ingredient_search_index.add(ingredient_id, name)
+        report.imported += len(batch)
+        batch.clear()
+
+    line_number = 0
+    async for line in lines:
+        line_number += 1
+        if not line.strip():
+            continue
+        try:
+            recipe = RecipeCreate.model_validate(json.loads(line))
+        except (ValueError, ValidationError) as e:
+            add_error(line_number, str(e.errors(include_url=False) if isinstance(e, ValidationError) else e))
+            continue
+        if not batch:
+            first_line = line_number
+        last_line = line_number
+        batch.append(recipe)
+        if len(batch) >= chunk_size:
+            await flush()
+    if batch:
+        await flush()
+    return report
@@ -0,0 +1,77 @@
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Iterable
+
+# Small in-process LRU cache with per-entry expiry. Entries can carry tags
+# (a user id, a recipe id...) so that everything derived from one object can
+# be dropped at once when it changes.
+
+_MISSING = object()
+
+
+class TTLCache:
+    def __init__(self, maxsize: int, ttl: float | None = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: OrderedDict[Hashable, tuple[Any, float | None, tuple]] = OrderedDict()
+        self._tags: dict[Hashable, set] = {}
+        # Bumped by invalidate_tag, see set(generation=)
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._entries.get(key, _MISSING)
+        if entry is _MISSING:
+            self.misses += 1
+            return default
+        value, expires_at, _ = entry
+        if expires_at is not None and expires_at <= time.time():
+            self.delete(key)
+            self.misses += 1
+            return default
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: float | None = None,
+            expires_at: float | None = None, tags: Iterable[Hashable] = (), generation: int | None = None):
+        # A value computed while a tag was invalidated (generation read before computing it) is not stored
+        if generation is not None and generation != self.generation:
+            return
+        if expires_at is None and (ttl or self.ttl) is not None:
+            expires_at = time.time() + (ttl or self.ttl)
+        if key in self._entries:
+            self.delete(key)
+        tags = tuple(tags)
+        self._entries[key] = (value, expires_at, tags)
+        for tag in tags:
+            self._tags.setdefault(tag, set()).add(key)
+        while len(self._entries) > self.maxsize:
+            self.delete(next(iter(self._entries)))
+
+    def delete(self, key: Hashable):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for tag in entry[2]:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+    def invalidate_tag(self, tag: Hashable):
+        self.generation += 1
+        for key in list(self._tags.get(tag, ())):
+            self.delete(key)
+
+    def clear(self):
+        self._entries.clear()
+        self._tags.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self) -> dict:
+        return {"size": len(self._entries), "hits": self.hits, "misses": self.misses}
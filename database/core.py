@@ -3,11 +3,34 @@ from pydantic_settings import BaseSettings
 class Settings(BaseSettings):
     # Database settings
     DATABASE_URL: str = 'Choose your DB url'
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_RECYCLE: int = 1800 # seconds, -1 disables recycling
+    DB_POOL_TIMEOUT: int = 30
+    IMPORT_CHUNK_SIZE: int = 500
+    # SQLite profile: WAL, per-connection pragmas, read-only pool and a single writer connection
+    SQLITE_TUNING: bool = True
+    SQLITE_SYNCHRONOUS: str = 'NORMAL'
+    SQLITE_MMAP_SIZE: int = 268435456 # bytes
+    SQLITE_CACHE_SIZE: int = 65536 # KiB per connection
+    SQLITE_BUSY_TIMEOUT: int = 5000 # ms
+    SQL_ECHO: bool = False # logs every statement, for development only
+    SLOW_QUERY_SECONDS: float = 0.5
+    # Response cache, in process unless CACHE_URL points to a Redis server
+    CACHE_URL: str | None = None
+    CACHE_TTL: int = 300
+    CACHE_SIZE: int = 10000
+    SHOPPING_LIST_CACHE_SIZE: int = 1000 # meal plans, in process
     SECRET: str ='Choose your secret'
     ALGORITHM: str = 'HS256'
     ACCESS_TOKEN_EXPIRES: int = 30
+    TOKEN_CACHE_SIZE: int = 10000
+    # Password hashing
+    BCRYPT_ROUNDS: int = 12
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_MAX_PENDING: int = 32
     
     class Config():
         env_file = '.env'
         
-settings = Settings()
\ No newline at end of file
+settings = Settings()
@@ -1,19 +1,89 @@
 from .core import settings
 
 #SQLModel
-from sqlmodel import SQLModel, create_engine, Session, text
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
 from models.recipes import Recipe, Ingredient
 from models.auth import User
+from .metrics import instrument_engine
+from . import recipe_search  # registers the full-text tables with create_all (tests, benchmark data)
 
+# Async drivers for the sync URLs people usually write in DATABASE_URL
+ASYNC_DRIVERS = {
+    'sqlite': 'sqlite+aiosqlite',
+    'postgresql': 'postgresql+asyncpg',
+    'postgresql+psycopg2': 'postgresql+asyncpg',
+}
 
-engine = create_engine(settings.DATABASE_URL, echo=True, connect_args={"check_same_thread":False})
 
-def create_db_and_tables():
-    SQLModel.metadata.create_all(engine)
-    with engine.connect() as connection:
-        connection.execute(text("PRAGMA foreign_keys=ON")) # This line is only for sqlite DB
+def async_database_url(database_url: str):
+    url = make_url(database_url)
+    return url.set(drivername=ASYNC_DRIVERS.get(url.drivername, url.drivername))
 
-def get_session():
-    with Session(engine) as session:
+
+def is_sqlite_file(database_url: str) -> bool:
+    url = make_url(database_url)
+    return url.get_backend_name() == 'sqlite' and url.database not in (None, '', ':memory:')
+
+
+def sqlite_pragmas(read_only: bool = False) -> list[str]:
+    # SQLite settings are per connection (journal_mode excepted), so they run on every new one
+    pragmas = ["PRAGMA foreign_keys=ON"]
+    if settings.SQLITE_TUNING:
+        pragmas += [f"PRAGMA busy_timeout={settings.SQLITE_BUSY_TIMEOUT}",
+                    f"PRAGMA synchronous={settings.SQLITE_SYNCHRONOUS}",
+                    f"PRAGMA mmap_size={settings.SQLITE_MMAP_SIZE}",
+                    f"PRAGMA cache_size=-{settings.SQLITE_CACHE_SIZE}"]
+        # WAL lets readers carry on while a write is in progress; it is stored in the file
+        pragmas.append("PRAGMA query_only=ON" if read_only else "PRAGMA journal_mode=WAL")
+    return pragmas
+
+
+def create_db_engine(database_url: str, read_only: bool = False, **kwargs):
+    url = async_database_url(database_url)
+    if url.get_backend_name() == 'sqlite':
+        kwargs.setdefault('connect_args', {"check_same_thread": False})
+    in_memory = url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:')
+    if 'poolclass' not in kwargs and not in_memory:
+        if is_sqlite_file(database_url) and settings.SQLITE_TUNING and not read_only:
+            # SQLite has one writer at a time: mutations queue for this connection in the
+            # event loop instead of contending for the file lock in busy_timeout loops
+            kwargs.setdefault('pool_size', 1)
+            kwargs.setdefault('max_overflow', 0)
+        kwargs.setdefault('pool_size', settings.DB_POOL_SIZE)
+        kwargs.setdefault('max_overflow', settings.DB_MAX_OVERFLOW)
+        kwargs.setdefault('pool_recycle', settings.DB_POOL_RECYCLE)
+        kwargs.setdefault('pool_timeout', settings.DB_POOL_TIMEOUT)
+    db_engine = create_async_engine(url, **kwargs)
+    if url.get_backend_name() == 'sqlite':
+        pragmas = sqlite_pragmas(read_only)
+
+        @event.listens_for(db_engine.sync_engine, 'connect')
+        def set_sqlite_pragmas(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            for pragma in pragmas:
+                cursor.execute(pragma)
+            cursor.close()
+    return db_engine
+
+
+engine = create_db_engine(settings.DATABASE_URL, echo=settings.SQL_ECHO)
+instrument_engine(engine)
+# GET endpoints read through their own pool; elsewhere (Postgres, in-memory SQLite) it is the same engine
+if is_sqlite_file(settings.DATABASE_URL) and settings.SQLITE_TUNING:
+    read_engine = create_db_engine(settings.DATABASE_URL, read_only=True, echo=settings.SQL_ECHO)
+    instrument_engine(read_engine, gauge_prefix='db_read_pool')
+else:
+    read_engine = engine
+
+async def get_session():
+    # expire_on_commit=False so that returned objects never lazy-load outside the event loop
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        yield session
+
+async def get_read_session():
+    # For endpoints that never write
+    async with AsyncSession(read_engine, expire_on_commit=False) as session:
         yield session
-        
\ No newline at end of file
@@ -0,0 +1,154 @@
+from datetime import timedelta
+from typing import Iterable
+from sqlalchemy import Integer, case, cast, delete, func, insert, literal, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from models.recipes import (Recipe, Ingredient, RecipeIngredientLink, RecipeFacet, FacetCount,
+                            IngredientFacetCount, RecipeFacets)
+from .recipes import recipes_with_all_ingredients_query
+
+# Browse counts ("312 recipes use garlic") read from the RecipeFacet table
+# instead of a GROUP BY over every recipe on each page view. The write paths
+# apply +1/-1 deltas in the same transaction as the recipe change, and
+# rebuild_facets recomputes everything from scratch for recovery.
+#
+# Rows: ('total', ''), ('difficulty', <value>), ('recipe_type', <value or ''>),
+# ('duration', <bucket label>) and ('ingredient', <ingredient id>).
+
+# (upper bound, label); the last bucket has no bound
+DURATION_BUCKETS = ((timedelta(minutes=15), '0-15m'), (timedelta(minutes=30), '15-30m'),
+                    (timedelta(hours=1), '30-60m'), (timedelta(hours=2), '1-2h'), (None, '2h+'))
+
+
+def duration_bucket(duration: timedelta) -> str:
+    for bound, label in DURATION_BUCKETS:
+        if bound is None or duration <= bound:
+            return label
+
+
+def duration_bucket_expression():
+    return case(*((Recipe.duration <= bound, label) for bound, label in DURATION_BUCKETS[:-1]),
+                else_=DURATION_BUCKETS[-1][1])
+
+
+def recipe_facet_values(recipe, ingredient_ids: Iterable[int] = ()) -> list[tuple[str, str]]:
+    # recipe: anything with difficulty, recipe_type and duration (a Recipe or a RecipeCreate)
+    return [('total', ''), ('difficulty', recipe.difficulty), ('recipe_type', recipe.recipe_type or ''),
+            ('duration', duration_bucket(recipe.duration))] + [('ingredient', str(i)) for i in ingredient_ids]
+
+
+async def update_facets(session: AsyncSession, added: Iterable[tuple[str, str]] = (),
+                        removed: Iterable[tuple[str, str]] = ()):
+    # Call before commit, in the transaction that changes the recipes
+    rows = {}
+    for delta, values in ((1, added), (-1, removed)):
+        for facet, value in values:
+            rows[facet, value] = rows.get((facet, value), 0) + delta
+    params = [{"facet": facet, "value": value, "count": count} for (facet, value), count in rows.items() if count]
+    if not params:
+        return
+    dialect = session.bind.dialect.name
+    if dialect in ('sqlite', 'postgresql'):
+        statement = (sqlite if dialect == 'sqlite' else postgresql).insert(RecipeFacet)
+        statement = statement.on_conflict_do_update(index_elements=[RecipeFacet.facet, RecipeFacet.value],
+                                                    set_={"count": RecipeFacet.count + statement.excluded.count})
+        await session.exec(statement, params=params)
+        return
+    for row in params:
+        result = await session.exec(update(RecipeFacet)
+                                    .where(RecipeFacet.facet == row["facet"], RecipeFacet.value == row["value"])
+                                    .values(count=RecipeFacet.count + row["count"]))
+        if result.rowcount == 0:
+            await session.exec(insert(RecipeFacet).values(**row))
+
+
+async def recipe_ingredient_ids(recipe_id: int, session: AsyncSession) -> list[int]:
+    return list((await session.exec(select(RecipeIngredientLink.ingredient_id)
+                                    .where(RecipeIngredientLink.recipe_id == recipe_id))).all())
+
+
+async def remove_ingredient_facet(ingredient_id: int, session: AsyncSession):
+    await session.exec(delete(RecipeFacet).where(RecipeFacet.facet == 'ingredient',
+                                                 RecipeFacet.value == str(ingredient_id)))
+
+
+def facet_queries():
+    # (facet, SELECT value, count(*)) per facet, for the rebuild
+    duration = duration_bucket_expression()
+    return [
+        ('total', select(literal(''), func.count()).select_from(Recipe)),
+        ('difficulty', select(Recipe.difficulty, func.count()).group_by(Recipe.difficulty)),
+        ('recipe_type', select(func.coalesce(Recipe.recipe_type, ''), func.count())
+         .group_by(func.coalesce(Recipe.recipe_type, ''))),
+        ('duration', select(duration, func.count()).group_by(duration)),
+        ('ingredient', select(RecipeIngredientLink.ingredient_id, func.count())
+         .group_by(RecipeIngredientLink.ingredient_id)),
+    ]
+
+
+async def rebuild_facets(session: AsyncSession) -> int:
+    await session.exec(delete(RecipeFacet))
+    rows = 0
+    for facet, query in facet_queries():
+        values = [{"facet": facet, "value": str(value), "count": count}
+                  for value, count in await session.exec(query) if count]
+        if values:
+            await session.exec(insert(RecipeFacet), params=values)
+            rows += len(values)
+    await session.commit()
+    return rows
+
+
+async def ingredient_facets(counts: list[tuple[int, int]], session: AsyncSession) -> list[IngredientFacetCount]:
+    names = dict((await session.exec(select(Ingredient.id, Ingredient.name)
+                                     .where(Ingredient.id.in_([i for i, _ in counts])))).all())
+    return [IngredientFacetCount(id=i, name=names[i], count=count) for i, count in counts if i in names]
+
+
+def facet_counts(rows: list[tuple[str, str, int]], facet: str) -> list[FacetCount]:
+    counts = [(value, count) for row_facet, value, count in rows if row_facet == facet and count > 0]
+    if facet == 'duration':
+        order = {label: i for i, (_, label) in enumerate(DURATION_BUCKETS)}
+        counts.sort(key=lambda item: order.get(item[0], len(order)))
+    else:
+        counts.sort(key=lambda item: (-item[1], item[0]))
+    return [FacetCount(value=value or None, count=count) for value, count in counts]
+
+
+def ingredient_id_order():
+    # Ties between ingredients go by id, as in get_filtered_facets, not by the id's text ('10' < '2')
+    return cast(RecipeFacet.value, Integer)
+
+
+async def get_facets(session: AsyncSession, top_ingredients: int = 20) -> RecipeFacets:
+    # Two reads of the small aggregate table, whatever the number of recipes
+    rows = (await session.exec(select(RecipeFacet.facet, RecipeFacet.value, RecipeFacet.count)
+                               .where(RecipeFacet.facet != 'ingredient'))).all()
+    top = (await session.exec(select(RecipeFacet.value, RecipeFacet.count)
+                              .where(RecipeFacet.facet == 'ingredient', RecipeFacet.count > 0)
+                              .order_by(RecipeFacet.count.desc(), ingredient_id_order())
+                              .limit(top_ingredients))).all()
+    total = next((count for facet, _, count in rows if facet == 'total'), 0)
+    return RecipeFacets(total=total, difficulty=facet_counts(rows, 'difficulty'),
+                        recipe_type=facet_counts(rows, 'recipe_type'), duration=facet_counts(rows, 'duration'),
+                        ingredients=await ingredient_facets([(int(value), count) for value, count in top], session))
+
+
+async def get_filtered_facets(ingredient_ids: list[int], session: AsyncSession,
+                              top_ingredients: int = 20) -> RecipeFacets:
+    # Same recipes as recipe_by_ingredients (all of the ingredients), counted on the fly
+    matching = recipes_with_all_ingredients_query(ingredient_ids).subquery()
+    rows = []
+    for facet, query in facet_queries()[:-1]:
+        query = query.where(Recipe.id.in_(select(matching.c.recipe_id)))
+        rows.extend((facet, str(value), count) for value, count in await session.exec(query))
+    top = (await session.exec(select(RecipeIngredientLink.ingredient_id, func.count())
+                              .where(RecipeIngredientLink.recipe_id.in_(select(matching.c.recipe_id)))
+                              .group_by(RecipeIngredientLink.ingredient_id)
+                              .order_by(func.count().desc(), RecipeIngredientLink.ingredient_id)
+                              .limit(top_ingredients))).all()
+    total = next((count for facet, _, count in rows if facet == 'total'), 0)
+    return RecipeFacets(total=total, difficulty=facet_counts(rows, 'difficulty'),
+                        recipe_type=facet_counts(rows, 'recipe_type'), duration=facet_counts(rows, 'duration'),
+                        ingredients=await ingredient_facets(list(top), session))
@@ -0,0 +1,75 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from fastapi import HTTPException, status
+from .core import settings
+from .metrics import password_hash_seconds
+
+# bcrypt releases the GIL while hashing, so a small thread pool is enough to
+# keep the event loop free. Work beyond max_pending is refused with a 503
+# instead of piling up behind the workers.
+
+
+class PasswordHasherPool:
+    def __init__(self, workers: int, max_pending: int):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='bcrypt')
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def _record_wait(self, waited: float):
+        with self._lock:
+            self.wait_seconds_total += waited
+            self.wait_seconds_max = max(self.wait_seconds_max, waited)
+
+    def _record_done(self, elapsed: float, operation: str):
+        with self._lock:
+            self.completed += 1
+            password_hash_seconds.observe(elapsed, operation)
+
+    def _release(self, future):
+        # When the executor is done with the task, not when the caller stops waiting:
+        # a hash already running after its request was cancelled still holds its slot
+        with self._lock:
+            self.pending -= 1
+
+    async def run(self, func, *args):
+        with self._lock:
+            if self.pending >= self.max_pending:
+                self.rejected += 1
+                raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                                    detail="Server busy, please retry", headers={"Retry-After": "1"})
+            self.pending += 1
+        queued_at = time.perf_counter()
+
+        def task():
+            started_at = time.perf_counter()
+            self._record_wait(started_at - queued_at)
+            try:
+                return func(*args)
+            finally:
+                self._record_done(time.perf_counter() - started_at, func.__name__)
+
+        future = self._executor.submit(task)
+        future.add_done_callback(self._release)
+        return await asyncio.wrap_future(future)
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "pending": self.pending,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "wait_seconds_total": self.wait_seconds_total,
+            "wait_seconds_max": self.wait_seconds_max,
+        }
+
+
+password_pool = PasswordHasherPool(workers=settings.PASSWORD_HASH_WORKERS,
+                                   max_pending=settings.PASSWORD_HASH_MAX_PENDING)
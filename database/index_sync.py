@@ -0,0 +1,53 @@
+import asyncio
+from typing import Awaitable, Callable
+from sqlalchemy import update
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from models.recipes import IndexVersion
+
+# The in-process indexes mirror tables that every worker, and the CLI, write
+# to. Each index has a row in indexversion, bumped in the same transaction by
+# every write that changes what the index holds:
+# - a worker whose copy is one version behind its own commit applies that
+#   change itself and stays current;
+# - any other gap means another process wrote in between, so reads go to SQL
+#   until a background rebuild has caught up.
+
+_rebuilds: dict[str, asyncio.Task] = {}
+
+
+async def bump_index_version(name: str, session: AsyncSession) -> int:
+    # Last statement before the commit: on Postgres the row stays locked until then
+    result = await session.exec(update(IndexVersion).where(IndexVersion.name == name)
+                                .values(version=IndexVersion.version + 1).returning(IndexVersion.version))
+    return result.scalar_one()
+
+
+async def read_index_version(name: str, session: AsyncSession) -> int:
+    return (await session.exec(select(IndexVersion.version).where(IndexVersion.name == name))).one()
+
+
+def catch_up(index, version: int) -> bool:
+    # After committing at version: True when that commit is the only change the index
+    # has not seen, and the caller applies it; otherwise the index is left behind
+    if index.ready and index.version == version - 1:
+        index.version = version
+        return True
+    return False
+
+
+async def index_is_current(index, build: Callable[[AsyncSession], Awaitable], session: AsyncSession) -> bool:
+    # False sends the caller to SQL; a stale index is rebuilt in the background meanwhile
+    if not index.ready:
+        return False
+    if await read_index_version(index.name, session) == index.version:
+        return True
+    task = _rebuilds.get(index.name)
+    if task is None or task.done() or task.get_loop() is not asyncio.get_running_loop():
+        _rebuilds[index.name] = asyncio.create_task(rebuild_index(build, session.bind))
+    return False
+
+
+async def rebuild_index(build: Callable[[AsyncSession], Awaitable], bind):
+    async with AsyncSession(bind) as session:
+        await build(session)
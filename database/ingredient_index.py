@@ -0,0 +1,106 @@
+from array import array
+from bisect import bisect_left, insort
+from collections import Counter, defaultdict
+from itertools import chain
+from typing import Iterable
+
+# In-process inverted index: ingredient id -> sorted array of recipe ids.
+# Every worker keeps its own copy, built at startup and updated by the
+# endpoints that add or remove recipes and ingredients. Writes from other
+# processes are noticed through its version, see database/index_sync.py.
+
+
+class IngredientIndex:
+    name = 'ingredient_index'
+
+    def __init__(self):
+        self._postings: dict[int, array] = {}
+        self._recipes: dict[int, tuple[int, ...]] = {}
+        self.ready = False
+        self.version: int | None = None
+
+    def build(self, links: Iterable[tuple[int, int]], version: int = 0):
+        # version: the IndexVersion counter read before the links
+        postings = defaultdict(list)
+        recipes = defaultdict(list)
+        for recipe_id, ingredient_id in links:
+            postings[ingredient_id].append(recipe_id)
+            recipes[recipe_id].append(ingredient_id)
+        self._postings = {ingredient_id: array('I', sorted(recipe_ids))
+                          for ingredient_id, recipe_ids in postings.items()}
+        self._recipes = {recipe_id: tuple(ingredient_ids)
+                         for recipe_id, ingredient_ids in recipes.items()}
+        self.version = version
+        self.ready = True
+
+    def clear(self):
+        self._postings = {}
+        self._recipes = {}
+        self.ready = False
+        self.version = None
+
+    def add_recipe(self, recipe_id: int, ingredient_ids: Iterable[int]):
+        ingredient_ids = tuple(dict.fromkeys(ingredient_ids))
+        self.remove_recipe(recipe_id)
+        for ingredient_id in ingredient_ids:
+            posting = self._postings.setdefault(ingredient_id, array('I'))
+            # New recipes almost always carry the highest id
+            if not posting or posting[-1] < recipe_id:
+                posting.append(recipe_id)
+            else:
+                insort(posting, recipe_id)
+        self._recipes[recipe_id] = ingredient_ids
+
+    def remove_recipe(self, recipe_id: int):
+        for ingredient_id in self._recipes.pop(recipe_id, ()):
+            posting = self._postings.get(ingredient_id)
+            if posting is None:
+                continue
+            i = bisect_left(posting, recipe_id)
+            if i < len(posting) and posting[i] == recipe_id:
+                del posting[i]
+            if not posting:
+                del self._postings[ingredient_id]
+
+    def remove_ingredient(self, ingredient_id: int):
+        for recipe_id in self._postings.pop(ingredient_id, ()):
+            self._recipes[recipe_id] = tuple(i for i in self._recipes.get(recipe_id, ())
+                                             if i != ingredient_id)
+
+    def recipes_with_all(self, ingredient_ids: Iterable[int]) -> list[int] | None:
+        # None means the index is cold and the caller has to ask the database
+        if not self.ready:
+            return None
+        postings = []
+        for ingredient_id in set(ingredient_ids):
+            posting = self._postings.get(ingredient_id)
+            if not posting:
+                return []
+            postings.append(posting)
+        if not postings:
+            return []
+        postings.sort(key=len)
+        matches = set(postings[0])
+        for posting in postings[1:]:
+            matches.intersection_update(posting)
+            if not matches:
+                return []
+        return sorted(matches)
+
+    def coverage(self, ingredient_ids: Iterable[int]) -> list[tuple[int, int, int]] | None:
+        # (recipe_id, matched, required) for every recipe using any of the ingredients
+        if not self.ready:
+            return None
+        postings = [self._postings[i] for i in set(ingredient_ids) if i in self._postings]
+        matched = Counter(chain.from_iterable(postings))
+        recipes = self._recipes
+        return [(recipe_id, count, len(recipes[recipe_id])) for recipe_id, count in matched.items()]
+
+    def ingredients_of(self, recipe_id: int) -> tuple[int, ...]:
+        return self._recipes.get(recipe_id, ())
+
+    def __len__(self):
+        return sum(len(posting) for posting in self._postings.values())
+
+
+ingredient_index = IngredientIndex()
@@ -0,0 +1,152 @@
+import heapq
+import math
+from bisect import bisect_left, insort
+from itertools import islice, takewhile
+from collections import Counter
+from typing import Iterable
+from sqlalchemy import func, literal
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from models.recipes import Ingredient
+from .normalization import normalize_ingredient_name
+from .index_sync import index_is_current, read_index_version
+
+# Autocomplete and typo-tolerant lookup over Ingredient.name. Postgres does it
+# with pg_trgm; other databases use this in-process index, built at startup and
+# updated by the endpoints that create or delete ingredients. Writes from other
+# processes are noticed through its version, see database/index_sync.py.
+#
+# Prefixes are answered from a sorted array of names with bisect, which gives a
+# trie's O(log n + k) lookups at a fraction of the memory of one node per char.
+
+SIMILARITY_THRESHOLD = 0.3
+
+
+def trigrams(name: str) -> set[str]:
+    # Same padding as pg_trgm: two blanks in front, one behind
+    padded = f"  {name} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class IngredientSearchIndex:
+    name = 'ingredient_search'
+
+    def __init__(self):
+        self._names: dict[int, str] = {}
+        self._ids_by_name: dict[str, int] = {}
+        self._sorted_names: list[str] = []
+        self._trigrams: dict[str, set[int]] = {}
+        self._trigram_counts: dict[int, int] = {}
+        self.ready = False
+        self.version: int | None = None
+
+    def build(self, ingredients: Iterable[tuple[int, str]], version: int = 0):
+        # version: the IndexVersion counter read before the ingredients
+        self.clear()
+        for ingredient_id, name in ingredients:
+            self._index(ingredient_id, name)
+        self._sorted_names = sorted(self._names.values())
+        self.version = version
+        self.ready = True
+
+    def clear(self):
+        self._names = {}
+        self._ids_by_name = {}
+        self._sorted_names = []
+        self._trigrams = {}
+        self._trigram_counts = {}
+        self.ready = False
+        self.version = None
+
+    def _index(self, ingredient_id: int, name: str):
+        self._names[ingredient_id] = name
+        self._ids_by_name[name] = ingredient_id
+        name_trigrams = trigrams(name)
+        self._trigram_counts[ingredient_id] = len(name_trigrams)
+        for trigram in name_trigrams:
+            self._trigrams.setdefault(trigram, set()).add(ingredient_id)
+
+    def add(self, ingredient_id: int, name: str):
+        self.remove(ingredient_id)
+        self._index(ingredient_id, name)
+        insort(self._sorted_names, name)
+
+    def remove(self, ingredient_id: int):
+        name = self._names.pop(ingredient_id, None)
+        if name is None:
+            return
+        self._ids_by_name.pop(name, None)
+        i = bisect_left(self._sorted_names, name)
+        if i < len(self._sorted_names) and self._sorted_names[i] == name:
+            del self._sorted_names[i]
+        self._trigram_counts.pop(ingredient_id, None)
+        for trigram in trigrams(name):
+            ids = self._trigrams.get(trigram)
+            if ids is not None:
+                ids.discard(ingredient_id)
+                if not ids:
+                    del self._trigrams[trigram]
+
+    def prefix(self, prefix: str, limit: int) -> list[str]:
+        # Shortest names first over the whole prefix range: 'sal' must not lose to 'salami...' for sorting later
+        start = bisect_left(self._sorted_names, prefix)
+        matches = takewhile(lambda name: name.startswith(prefix), islice(self._sorted_names, start, None))
+        return heapq.nsmallest(limit, matches, key=lambda name: (len(name), name))
+
+    def search(self, query: str, limit: int) -> list[tuple[int, str, float]]:
+        # (id, name, score): prefix matches first (closest length first), then by trigram similarity
+        query = normalize_ingredient_name(query)
+        if not query:
+            return []
+        results = {}
+        for name in self.prefix(query, limit):
+            results[self._ids_by_name[name]] = 1.0 + len(query) / len(name)
+        if len(results) < limit:
+            results.update(self._similar(query, exclude=results))
+        best = sorted(results.items(), key=lambda item: (-item[1], item[0]))[:limit]
+        return [(ingredient_id, self._names[ingredient_id], min(score, 1.0)) for ingredient_id, score in best]
+
+    def _similar(self, query: str, exclude) -> dict[int, float]:
+        query_trigrams = trigrams(query)
+        shared = Counter()
+        for trigram in query_trigrams:
+            shared.update(self._trigrams.get(trigram, ()))
+        size = len(query_trigrams)
+        # similarity >= t needs at least t * size shared trigrams, a cheap test to run first
+        minimum = max(1, math.ceil(SIMILARITY_THRESHOLD * size))
+        counts = self._trigram_counts
+        return {ingredient_id: similarity for ingredient_id, count in shared.items()
+                if count >= minimum and ingredient_id not in exclude
+                for similarity in (count / (size + counts[ingredient_id] - count),)
+                if similarity >= SIMILARITY_THRESHOLD}
+
+
+ingredient_search_index = IngredientSearchIndex()
+
+
+async def build_ingredient_search_index(session: AsyncSession):
+    if session.bind.dialect.name == 'postgresql':
+        return
+    version = await read_index_version(ingredient_search_index.name, session)
+    ingredient_search_index.build(await session.exec(select(Ingredient.id, Ingredient.name)), version)
+
+
+async def search_ingredients(query: str, limit: int, session: AsyncSession) -> list[tuple[int, str, float]]:
+    if session.bind.dialect.name == 'postgresql':
+        query = normalize_ingredient_name(query)
+        is_prefix = Ingredient.name.startswith(query, autoescape=True)
+        similarity = func.similarity(Ingredient.name, query)
+        rows = await session.exec(
+            select(Ingredient.id, Ingredient.name, similarity)
+            .where(is_prefix | Ingredient.name.op('%')(literal(query)))
+            .order_by(is_prefix.desc(), similarity.desc(), Ingredient.id)
+            .limit(limit))
+        return [(ingredient_id, name, float(score)) for ingredient_id, name, score in rows]
+    if await index_is_current(ingredient_search_index, build_ingredient_search_index, session):
+        return ingredient_search_index.search(query, limit)
+    # Cold or stale index: at least answer prefixes from the database
+    query = normalize_ingredient_name(query)
+    rows = await session.exec(select(Ingredient.id, Ingredient.name)
+                              .where(Ingredient.name.startswith(query, autoescape=True))
+                              .order_by(func.length(Ingredient.name), Ingredient.name).limit(limit))
+    return [(ingredient_id, name, 1.0) for ingredient_id, name in rows]
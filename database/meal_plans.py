@@ -0,0 +1,82 @@
+import hashlib
+import json
+from collections import Counter
+from datetime import timedelta
+from typing import Iterable
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from models.recipes import Recipe, Ingredient, RecipeIngredientLink, MealPlanEntry, ShoppingListItem, ShoppingList
+from .cache import TTLCache
+from .core import settings
+from .utils import format_ingredient_name, format_duration
+
+# Shopping lists for meal plans: every ingredient of the planned recipes once,
+# with the servings it has to cover, plus the total cooking time. A plan is
+# read with one outer join and folded into Counters as the rows arrive.
+#
+# Weekly plans come back again and again, so lists are cached per plan hash
+# and tagged with their recipe and ingredient ids. The endpoints that change
+# those drop the entries; other workers keep theirs until CACHE_TTL.
+
+shopping_list_cache = TTLCache(maxsize=settings.SHOPPING_LIST_CACHE_SIZE, ttl=settings.CACHE_TTL)
+
+
+def plan_key(plan: Iterable[MealPlanEntry]) -> str:
+    # Same key whatever the order of the entries
+    entries = sorted((entry.recipe_id, entry.servings) for entry in plan)
+    return hashlib.blake2b(json.dumps(entries).encode(), digest_size=16).hexdigest()
+
+
+def shopping_list_query(recipe_ids: list[int]):
+    # Outer joins so that recipes without ingredients still count towards the duration
+    return (select(Recipe.id, Recipe.duration, Ingredient.id, Ingredient.name)
+            .outerjoin(RecipeIngredientLink, RecipeIngredientLink.recipe_id == Recipe.id)
+            .outerjoin(Ingredient, Ingredient.id == RecipeIngredientLink.ingredient_id)
+            .where(Recipe.id.in_(recipe_ids)))
+
+
+async def build_shopping_list(plan: list[MealPlanEntry], session: AsyncSession) -> tuple[ShoppingList, set]:
+    # Returns the list and the cache tags it depends on
+    servings, cooked = Counter(), Counter()
+    for entry in plan:
+        servings[entry.recipe_id] += entry.servings
+        cooked[entry.recipe_id] += 1
+    durations = {}
+    needed = Counter()
+    used_by: dict[str, set[int]] = {}
+    tags = {('recipe', recipe_id) for recipe_id in servings}
+    for recipe_id, duration, ingredient_id, name in await session.exec(shopping_list_query(list(servings))):
+        durations[recipe_id] = duration
+        if name is None:
+            continue
+        tags.add(('ingredient', ingredient_id))
+        # Rows stored under older normalization rules merge with their current spelling
+        name = format_ingredient_name(name)
+        recipes = used_by.setdefault(name, set())
+        if recipe_id not in recipes:
+            recipes.add(recipe_id)
+            needed[name] += servings[recipe_id]
+
+    items = [ShoppingListItem(name=name, servings=needed[name], recipes=sorted(used_by[name])) for name in sorted(needed)]
+    total = sum((duration * cooked[recipe_id] for recipe_id, duration in durations.items()), timedelta())
+    return ShoppingList(items=items, total_duration=format_duration(total),
+                        missing=sorted(set(servings) - set(durations))), tags
+
+
+async def get_shopping_list(plan: list[MealPlanEntry], session: AsyncSession) -> ShoppingList:
+    key = plan_key(plan)
+    shopping_list = shopping_list_cache.get(key)
+    if shopping_list is None:
+        # The tags are only known once built, so any invalidation meanwhile skips the store
+        generation = shopping_list_cache.generation
+        shopping_list, tags = await build_shopping_list(plan, session)
+        shopping_list_cache.set(key, shopping_list, tags=tags, generation=generation)
+    return shopping_list
+
+
+def invalidate_shopping_lists(recipe_ids: Iterable[int] = (), ingredient_ids: Iterable[int] = ()):
+    # Also for new recipes: a plan may have listed their id as missing
+    for recipe_id in recipe_ids:
+        shopping_list_cache.invalidate_tag(('recipe', recipe_id))
+    for ingredient_id in ingredient_ids:
+        shopping_list_cache.invalidate_tag(('ingredient', ingredient_id))
@@ -0,0 +1,215 @@
+import logging
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Callable
+from sqlalchemy import event
+from .core import settings
+
+# Process-local metrics in the Prometheus text format, without the
+# prometheus_client dependency. Each worker process exposes its own numbers on
+# /metrics, so scrape every worker (or run a single one behind the scraper).
+
+slow_query_logger = logging.getLogger('recipes.slow_queries')
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+def _labels(names: tuple[str, ...], values: tuple, extra: str = '') -> str:
+    pairs = [f'{name}="{str(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self._values: dict[tuple, float] = {}
+
+    def inc(self, amount: float = 1, *labels):
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels) -> float:
+        return self._values.get(labels, 0)
+
+    def render(self) -> list[str]:
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} counter']
+        for labels, value in sorted(self._values.items()):
+            lines.append(f'{self.name}{_labels(self.labelnames, labels)} {value}')
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = (), buckets: tuple = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.buckets = buckets
+        # labels -> [count per bucket (last one is +Inf), sum]
+        self._series: dict[tuple, list] = {}
+
+    def observe(self, value: float, *labels):
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    def count(self, *labels) -> int:
+        series = self._series.get(labels)
+        return sum(series[0]) if series else 0
+
+    def render(self) -> list[str]:
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        for labels, (counts, total) in sorted(self._series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += count
+                le = f'le="{bound}"'
+                lines.append(f'{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}')
+            lines.append(f'{self.name}_sum{_labels(self.labelnames, labels)} {total}')
+            lines.append(f'{self.name}_count{_labels(self.labelnames, labels)} {cumulative}')
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+        # name -> (type, help, function returning the current value); registering a name again replaces it
+        self._callbacks: dict[str, tuple[str, str, Callable[[], float]]] = {}
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def register_callback(self, name: str, kind: str, help: str, func: Callable[[], float]):
+        self._callbacks[name] = (kind, help, func)
+
+    def register_stats(self, prefix: str, stats: Callable[[], dict], counters: tuple[str, ...] = ()):
+        # Exposes every key of a stats() dict, as counters for the keys listed in counters
+        for key in stats():
+            name, kind = (f'{prefix}_{key}', 'gauge') if key not in counters else (
+                f'{prefix}_{key.removesuffix("_total")}_total', 'counter')
+            self.register_callback(name, kind, f'{prefix} {key}', lambda key=key: stats()[key])
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for name, (kind, help, func) in self._callbacks.items():
+            lines.extend((f'# HELP {name} {help}', f'# TYPE {name} {kind}', f'{name} {func()}'))
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+http_request_seconds = registry.register(Histogram(
+    'http_request_duration_seconds', 'Time spent handling HTTP requests', ('method', 'route', 'status')))
+http_request_queries = registry.register(Histogram(
+    'http_request_db_queries', 'SQL statements executed per HTTP request', ('route',), COUNT_BUCKETS))
+http_request_db_seconds = registry.register(Histogram(
+    'http_request_db_seconds', 'Time spent in SQL statements per HTTP request', ('route',)))
+db_queries = registry.register(Counter('db_queries_total', 'SQL statements executed'))
+db_rows = registry.register(Counter('db_rows_written_total', 'Rows changed by INSERT, UPDATE and DELETE statements'))
+db_query_seconds = registry.register(Histogram('db_query_duration_seconds', 'SQL statement execution time'))
+db_slow_queries = registry.register(Counter('db_slow_queries_total', 'SQL statements slower than SLOW_QUERY_SECONDS'))
+db_checkout_seconds = registry.register(Histogram(
+    'db_pool_checkout_wait_seconds', 'Time spent waiting for a pooled database connection'))
+password_hash_seconds = registry.register(Histogram(
+    'password_hash_seconds', 'bcrypt hash and verify time, excluding the wait for a worker', ('operation',)))
+jwt_seconds = registry.register(Histogram('jwt_seconds', 'JWT encode and decode time', ('operation',)))
+
+
+class RequestStats:
+    __slots__ = ('queries', 'db_seconds')
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+
+
+# Set by MetricsMiddleware for the duration of each request
+request_stats: ContextVar[RequestStats | None] = ContextVar('request_stats', default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # Kept on the execution context, which goes away with the statement: after_cursor_execute
+    # never fires for one that raises. Only the dialect's own setup queries run without a context.
+    if context is not None:
+        context._query_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is None:
+        return
+    elapsed = time.perf_counter() - context._query_start
+    db_queries.inc()
+    db_query_seconds.observe(elapsed)
+    if (context.isinsert or context.isupdate or context.isdelete) and cursor.rowcount > 0:
+        db_rows.inc(cursor.rowcount)
+    stats = request_stats.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_seconds += elapsed
+    if elapsed >= settings.SLOW_QUERY_SECONDS:
+        db_slow_queries.inc()
+        slow_query_logger.warning("Slow query (%.3f s): %s", elapsed, statement)
+
+
+def instrument_engine(engine, gauge_prefix: str = 'db_pool', registry: Registry = registry):
+    # engine is an AsyncEngine; SQLAlchemy events live on its sync_engine
+    sync_engine = engine.sync_engine
+    event.listen(sync_engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(sync_engine, 'after_cursor_execute', _after_cursor_execute)
+
+    # The pool's checkout event only fires once the wait is over, so time the engine's raw_connection(),
+    # which every Connection goes through. Unlike the pool, the engine survives dispose().
+    raw_connection = sync_engine.raw_connection
+
+    def timed_raw_connection():
+        start = time.perf_counter()
+        try:
+            return raw_connection()
+        finally:
+            db_checkout_seconds.observe(time.perf_counter() - start)
+    sync_engine.raw_connection = timed_raw_connection
+
+    # Looked up on every scrape: dispose() replaces the pool
+    for name in ('size', 'checkedout', 'overflow'):
+        if hasattr(sync_engine.pool, name):
+            registry.register_callback(f'{gauge_prefix}_{name}', 'gauge', f'Connection pool {name}',
+                                       lambda name=name: getattr(sync_engine.pool, name)())
+
+
+class MetricsMiddleware:
+    # Plain ASGI middleware: BaseHTTPMiddleware would run the endpoint in a separate task
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            return await self.app(scope, receive, send)
+        stats = RequestStats()
+        token = request_stats.set(stats)
+        status_code = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message['type'] == 'http.response.start':
+                status_code = message['status']
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            request_stats.reset(token)
+            # Route template rather than the raw path, so /recipes/1 and /recipes/2 share a series
+            route = getattr(scope.get('route'), 'path', 'unmatched')
+            http_request_seconds.observe(time.perf_counter() - start, scope['method'], route, status_code)
+            http_request_queries.observe(stats.queries, route)
+            http_request_db_seconds.observe(stats.db_seconds, route)
@@ -0,0 +1,52 @@
+import re
+import unicodedata
+from functools import lru_cache
+from typing import Iterable
+
+# Ingredient names are compared in a folded form: lower case, accents and any
+# other combining marks removed after NFKD decomposition, no whitespace.
+# 'Jalapeño ', 'JALAPENO' and 'jala peño' all become 'jalapeno'.
+
+_COMBINING_MARKS = ((0x0300, 0x036F), (0x1AB0, 0x1AFF), (0x1DC0, 0x1DFF), (0x20D0, 0x20FF), (0xFE20, 0xFE2F))
+# NFKD already turns no-break and other unicode spaces into ' '
+_WHITESPACE = ' \t\n\r\x0b\x0c'
+
+_ACCENTS_TABLE = {code: None for start, end in _COMBINING_MARKS for code in range(start, end + 1)}
+_WHITESPACE_TABLE = str.maketrans('', '', _WHITESPACE)
+_NAME_TABLE = _ACCENTS_TABLE | _WHITESPACE_TABLE
+# Anything left after NFKD that is neither ASCII nor a combining mark (ø, ß, non-latin scripts...)
+_OTHER_NON_ASCII = re.compile(r'[^\x00-\x7f' + ''.join(rf'\u{start:04x}-\u{end:04x}' for start, end in _COMBINING_MARKS) + ']')
+
+_SEPARATOR = '\x1f'
+
+
+def _fold(text: str, table: dict, keep_whitespace: bool) -> str:
+    text = text.lower()
+    if text.isascii():
+        return text if keep_whitespace else text.translate(table)
+    text = unicodedata.normalize('NFKD', text)
+    if _OTHER_NON_ASCII.search(text) is None:
+        # Only combining marks to drop: the ASCII codec does it far faster than a dict translate
+        text = text.encode('ascii', 'ignore').decode('ascii')
+        return text if keep_whitespace else text.translate(_WHITESPACE_TABLE)
+    return text.translate(table)
+
+
+def fold_accents(text: str) -> str:
+    # Lower case without accents, whitespace is kept (used for full text)
+    return _fold(text, _ACCENTS_TABLE, keep_whitespace=True)
+
+
+@lru_cache(maxsize=65536)
+def normalize_ingredient_name(name: str) -> str:
+    return _fold(name, _NAME_TABLE, keep_whitespace=False)
+
+
+def normalize_ingredient_names(names: Iterable[str]) -> list[str]:
+    # One lower/NFKD/translate pass over the whole batch instead of one per name
+    names = list(names)
+    normalized = _fold(_SEPARATOR.join(names), _NAME_TABLE, keep_whitespace=False).split(_SEPARATOR)
+    if len(normalized) != len(names):
+        # A name contained the separator itself
+        return [normalize_ingredient_name(name) for name in names]
+    return normalized
@@ -0,0 +1,134 @@
+import re
+from typing import Iterable
+from sqlalchemy import case, event, literal, or_, text
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from models.recipes import Recipe
+from .normalization import fold_accents
+
+# Ranked full-text search over Recipe.name, recipe_type and steps.
+#
+# SQLite keeps a standalone FTS5 table (rowid = recipe id) and Postgres a
+# recipe_search table with a weighted tsvector behind a GIN index. Both are
+# fed text already folded by fold_accents, the same folding used for
+# ingredient names, and are written in the same transaction as the recipe by
+# the create/update/delete paths. The migrations create the tables, and so
+# does metadata.create_all along with the recipe table (tests, benchmark data).
+
+SEARCH_DDL = {
+    'sqlite': (
+        text("CREATE VIRTUAL TABLE IF NOT EXISTS recipe_fts USING fts5("
+             "name, recipe_type, steps, tokenize = 'unicode61 remove_diacritics 2')"),
+    ),
+    'postgresql': (
+        text("CREATE TABLE IF NOT EXISTS recipe_search ("
+             "recipe_id INTEGER PRIMARY KEY REFERENCES recipe (id) ON DELETE CASCADE, "
+             "document TSVECTOR NOT NULL)"),
+        text("CREATE INDEX IF NOT EXISTS ix_recipe_search_document ON recipe_search USING gin (document)"),
+    ),
+}
+
+
+@event.listens_for(Recipe.__table__, 'after_create')
+def create_search_tables(target, connection, **kwargs):
+    for statement in SEARCH_DDL.get(connection.dialect.name, ()):
+        connection.execute(statement)
+
+
+# Column weights: a hit in the name counts more than one in the type, then the steps
+SQLITE_SEARCH = text(
+    "SELECT rowid, -bm25(recipe_fts, 10.0, 4.0, 1.0) AS score FROM recipe_fts "
+    "WHERE recipe_fts MATCH :query ORDER BY bm25(recipe_fts, 10.0, 4.0, 1.0), rowid "
+    "LIMIT :limit OFFSET :offset")
+
+POSTGRES_SEARCH = text(
+    "SELECT recipe_id, ts_rank_cd(document, query) AS score "
+    "FROM recipe_search, to_tsquery('simple', :query) AS query "
+    "WHERE document @@ query ORDER BY score DESC, recipe_id LIMIT :limit OFFSET :offset")
+
+POSTGRES_UPSERT = text(
+    "INSERT INTO recipe_search (recipe_id, document) VALUES (:id, "
+    "setweight(to_tsvector('simple', :name), 'A') || setweight(to_tsvector('simple', :recipe_type), 'B') || "
+    "setweight(to_tsvector('simple', :steps), 'C')) "
+    "ON CONFLICT (recipe_id) DO UPDATE SET document = EXCLUDED.document")
+
+
+def _document(recipe: dict) -> dict:
+    return {"id": recipe["id"], "name": fold_accents(recipe["name"] or ''),
+            "recipe_type": fold_accents(recipe["recipe_type"] or ''), "steps": fold_accents(recipe["steps"] or '')}
+
+
+async def index_documents(recipes: Iterable[dict], session: AsyncSession):
+    # Dicts with id, name, recipe_type and steps; call before commit so they land in the same transaction
+    documents = [_document(recipe) for recipe in recipes]
+    if not documents:
+        return
+    dialect = session.bind.dialect.name
+    if dialect == 'sqlite':
+        await session.exec(text("DELETE FROM recipe_fts WHERE rowid = :id"), params=[{"id": d["id"]} for d in documents])
+        await session.exec(text("INSERT INTO recipe_fts (rowid, name, recipe_type, steps) "
+                                "VALUES (:id, :name, :recipe_type, :steps)"), params=documents)
+    elif dialect == 'postgresql':
+        await session.exec(POSTGRES_UPSERT, params=documents)
+
+
+async def index_recipes(recipes: Iterable, session: AsyncSession):
+    await index_documents(({"id": r.id, "name": r.name, "recipe_type": r.recipe_type, "steps": r.steps}
+                           for r in recipes), session)
+
+
+async def unindex_recipe(recipe_id: int, session: AsyncSession):
+    # Postgres rows go away with the recipe through ON DELETE CASCADE
+    if session.bind.dialect.name == 'sqlite':
+        await session.exec(text("DELETE FROM recipe_fts WHERE rowid = :id"), params={"id": recipe_id})
+
+
+def search_terms(query: str) -> list[str]:
+    return re.findall(r'\w+', fold_accents(query))
+
+
+async def search_recipe_ids(query: str, limit: int, offset: int,
+                            session: AsyncSession) -> list[tuple[int, float]]:
+    # (recipe id, score) best first; the last word is matched as a prefix
+    terms = search_terms(query)
+    if not terms:
+        return []
+    dialect = session.bind.dialect.name
+    if dialect == 'sqlite':
+        statement = SQLITE_SEARCH
+        match = " ".join(f'"{term}"' for term in terms[:-1]) + f' "{terms[-1]}"*'
+    elif dialect == 'postgresql':
+        statement = POSTGRES_SEARCH
+        match = " & ".join(terms[:-1] + [f"{terms[-1]}:*"])
+    else:
+        return await like_search_recipe_ids(terms, limit, offset, session)
+    rows = await session.exec(statement, params={"query": match, "limit": limit, "offset": offset})
+    return [(recipe_id, float(score)) for recipe_id, score in rows]
+
+
+async def like_search_recipe_ids(terms: list[str], limit: int, offset: int,
+                                 session: AsyncSession) -> list[tuple[int, float]]:
+    # Other databases: every word somewhere in the recipe, scored by the words found in the
+    # name. A scan without an index or accent folding, but the endpoint still answers.
+    columns = (Recipe.name, Recipe.recipe_type, Recipe.steps)
+    score = sum((case((Recipe.name.icontains(term, autoescape=True), 1), else_=0) for term in terms), literal(0))
+    query = (select(Recipe.id, score)
+             .where(*(or_(*(column.icontains(term, autoescape=True) for column in columns)) for term in terms))
+             .order_by(score.desc(), Recipe.id).limit(limit).offset(offset))
+    return [(recipe_id, float(score)) for recipe_id, score in await session.exec(query)]
+
+
+async def rebuild_recipe_search(session: AsyncSession, batch_size: int = 1000) -> int:
+    # Also creates the search tables for databases that predate them
+    dialect = session.bind.dialect.name
+    for statement in SEARCH_DDL.get(dialect, ()):
+        await session.exec(statement)
+    await session.exec(text("DELETE FROM recipe_fts" if dialect == 'sqlite' else "DELETE FROM recipe_search"))
+    indexed = 0
+    result = await session.stream(select(Recipe.id, Recipe.name, Recipe.recipe_type, Recipe.steps)
+                                  .execution_options(yield_per=batch_size))
+    async for partition in result.partitions():
+        await index_recipes(partition, session)
+        indexed += len(partition)
+    await session.commit()
+    return indexed
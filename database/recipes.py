@@ -0,0 +1,136 @@
+import base64
+import heapq
+from sqlalchemy import case, func
+from sqlalchemy.orm import selectinload
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from datetime import timedelta
+from models.recipes import Recipe, Ingredient, RecipeIngredientLink
+from .ingredient_index import ingredient_index
+from .index_sync import index_is_current, read_index_version
+
+# SQLite caps the number of bound parameters per statement
+IN_CHUNK_SIZE = 500
+
+
+def recipes_with_all_ingredients_query(ingredient_ids: list[int]):
+    ingredient_ids = set(ingredient_ids)
+    return (select(RecipeIngredientLink.recipe_id)
+            .where(RecipeIngredientLink.ingredient_id.in_(ingredient_ids))
+            .group_by(RecipeIngredientLink.recipe_id)
+            .having(func.count(RecipeIngredientLink.ingredient_id) == len(ingredient_ids))
+            .order_by(RecipeIngredientLink.recipe_id))
+
+
+async def recipe_ids_with_all_ingredients(ingredient_ids: list[int], session: AsyncSession) -> list[int]:
+    if await index_is_current(ingredient_index, build_ingredient_index, session):
+        return ingredient_index.recipes_with_all(ingredient_ids)
+    return list((await session.exec(recipes_with_all_ingredients_query(ingredient_ids))).all())
+
+
+def with_ingredients_option(query, with_ingredients: bool):
+    # One extra SELECT ... WHERE recipe_id IN (...) for the whole result instead of one per recipe
+    return query.options(selectinload(Recipe.ingredients)) if with_ingredients else query
+
+
+async def get_recipes_by_ids(recipe_ids: list[int], session: AsyncSession,
+                             with_ingredients: bool = False) -> list[Recipe]:
+    recipes = []
+    for start in range(0, len(recipe_ids), IN_CHUNK_SIZE):
+        chunk = recipe_ids[start:start + IN_CHUNK_SIZE]
+        query = with_ingredients_option(select(Recipe).where(Recipe.id.in_(chunk)).order_by(Recipe.id), with_ingredients)
+        recipes.extend((await session.exec(query)).all())
+    return recipes
+
+
+async def get_recipes_in_order(recipe_ids: list[int], session: AsyncSession,
+                               with_ingredients: bool = False) -> tuple[list[Recipe], list[int]]:
+    # (recipes in the order asked for, ids that do not exist); duplicates are returned once
+    recipe_ids = list(dict.fromkeys(recipe_ids))
+    recipes = {recipe.id: recipe for recipe in await get_recipes_by_ids(recipe_ids, session, with_ingredients)}
+    return ([recipes[recipe_id] for recipe_id in recipe_ids if recipe_id in recipes],
+            [recipe_id for recipe_id in recipe_ids if recipe_id not in recipes])
+
+
+def recipe_list_query(after_id: int | None = None, difficulty: str | None = None,
+                      recipe_type: str | None = None, max_duration: timedelta | None = None,
+                      owner_id: int | None = None):
+    # Keyset pagination: WHERE id > :after ORDER BY id uses the primary key, however deep the page
+    query = select(Recipe).order_by(Recipe.id)
+    if after_id is not None:
+        query = query.where(Recipe.id > after_id)
+    if owner_id is not None:
+        # ix_recipe_owner_id; in SQLite its entries are ordered by rowid within an owner, so no sort either
+        query = query.where(Recipe.owner_id == owner_id)
+    if difficulty is not None:
+        query = query.where(Recipe.difficulty == difficulty)
+    if recipe_type is not None:
+        query = query.where(Recipe.recipe_type == recipe_type)
+    if max_duration is not None:
+        query = query.where(Recipe.duration <= max_duration)
+    return query
+
+
+def ingredient_list_query(after_id: int | None = None):
+    query = select(Ingredient).order_by(Ingredient.id)
+    if after_id is not None:
+        query = query.where(Ingredient.id > after_id)
+    return query
+
+
+async def stream_ndjson(query, public_model, session: AsyncSession, batch_size: int = 1000):
+    # Server-side cursor, one batch of rows in memory at a time
+    result = await session.stream(query.execution_options(yield_per=batch_size))
+    async for partition in result.scalars().partitions():
+        yield "".join(public_model.model_validate(row).model_dump_json() + "\n" for row in partition)
+        session.expunge_all()
+
+
+def coverage_query(ingredient_ids: list[int]):
+    candidates = select(RecipeIngredientLink.recipe_id).where(RecipeIngredientLink.ingredient_id.in_(ingredient_ids))
+    matched = func.sum(case((RecipeIngredientLink.ingredient_id.in_(ingredient_ids), 1), else_=0))
+    return (select(RecipeIngredientLink.recipe_id, matched, func.count(RecipeIngredientLink.ingredient_id))
+            .where(RecipeIngredientLink.recipe_id.in_(candidates))
+            .group_by(RecipeIngredientLink.recipe_id))
+
+
+async def recipe_coverage(ingredient_ids: list[int], session: AsyncSession) -> list[tuple[int, int, int]]:
+    ingredient_ids = list(set(ingredient_ids))
+    if not ingredient_ids:
+        return []
+    if await index_is_current(ingredient_index, build_ingredient_index, session):
+        return ingredient_index.coverage(ingredient_ids)
+    return (await session.exec(coverage_query(ingredient_ids))).all()
+
+
+def coverage_key(row: tuple[int, int, int]) -> tuple[float, int, int]:
+    # Best coverage first, then fewest missing ingredients, then oldest recipe
+    recipe_id, matched, required = row
+    return (-matched / required, required - matched, recipe_id)
+
+
+def top_k_by_coverage(rows: list[tuple[int, int, int]], k: int,
+                      after: tuple[int, int, int] | None = None) -> list[tuple[int, int, int]]:
+    if after is not None:
+        after_key = coverage_key(after)
+        rows = (row for row in rows if coverage_key(row) > after_key)
+    return heapq.nsmallest(k, rows, key=coverage_key)
+
+
+def encode_cursor(*values: int) -> str:
+    return base64.urlsafe_b64encode(".".join(map(str, values)).encode()).decode()
+
+
+def decode_cursor(cursor: str, size: int) -> tuple[int, ...]:
+    # Raises ValueError on anything that was not produced by encode_cursor
+    values = tuple(int(v) for v in base64.urlsafe_b64decode(cursor.encode()).decode().split("."))
+    if len(values) != size:
+        raise ValueError("Invalid cursor")
+    return values
+
+
+async def build_ingredient_index(session: AsyncSession):
+    # The version first: a write committed in between only makes the copy look older than it is
+    version = await read_index_version(ingredient_index.name, session)
+    links = await session.exec(select(RecipeIngredientLink.recipe_id, RecipeIngredientLink.ingredient_id))
+    ingredient_index.build(links, version)
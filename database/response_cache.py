@@ -0,0 +1,102 @@
+import hashlib
+import secrets
+from typing import Protocol
+from .cache import TTLCache
+from .core import settings
+
+# Read-through cache for serialized responses, stored as b'<etag>\n<json body>'.
+# The in-process backend is private to each worker, so an invalidation on one
+# worker leaves the others serving the old payload until CACHE_TTL; point
+# CACHE_URL at a Redis server to share the cache between workers.
+
+
+class CacheBackend(Protocol):
+    async def get(self, key: str) -> bytes | None: ...
+    async def set(self, key: str, value: bytes, ttl: int): ...
+    async def delete(self, *keys: str): ...
+
+
+class MemoryBackend:
+    def __init__(self, maxsize: int):
+        self.cache = TTLCache(maxsize=maxsize)
+
+    async def get(self, key: str) -> bytes | None:
+        return self.cache.get(key)
+
+    async def set(self, key: str, value: bytes, ttl: int):
+        self.cache.set(key, value, ttl=ttl)
+
+    async def delete(self, *keys: str):
+        for key in keys:
+            self.cache.delete(key)
+
+
+class RedisBackend:
+    # Works with any client exposing redis.asyncio's get/set(ex=)/delete
+    def __init__(self, client):
+        self.client = client
+
+    async def get(self, key: str) -> bytes | None:
+        return await self.client.get(key)
+
+    async def set(self, key: str, value: bytes, ttl: int):
+        await self.client.set(key, value, ex=ttl)
+
+    async def delete(self, *keys: str):
+        if keys:
+            await self.client.delete(*keys)
+
+
+def make_etag(body: bytes) -> str:
+    return '"' + hashlib.blake2b(body, digest_size=12).hexdigest() + '"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    # RFC 9110 13.1.2: a comma separated list of entity tags or "*", compared weakly
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip() for candidate in if_none_match.split(',')]
+    return '*' in candidates or etag.removeprefix('W/') in (candidate.removeprefix('W/') for candidate in candidates)
+
+
+class ResponseCache:
+    def __init__(self, backend: CacheBackend, ttl: int, prefix: str = 'recipes:'):
+        self.backend = backend
+        self.ttl = ttl
+        self.prefix = prefix
+
+    async def get(self, key: str) -> tuple[str, bytes] | None:
+        entry = await self.backend.get(self.prefix + key)
+        if entry is None:
+            return None
+        etag, _, body = entry.partition(b'\n')
+        return etag.decode(), body
+
+    async def generation(self, key: str) -> bytes | None:
+        # Changes on every invalidation of key, read it before loading the value passed to set()
+        return await self.backend.get(self.prefix + 'gen:' + key)
+
+    async def set(self, key: str, body: bytes, generation: bytes | None = None) -> tuple[str, bytes]:
+        etag = make_etag(body)
+        # A body loaded before an invalidation must not be stored after it
+        if generation == await self.generation(key):
+            await self.backend.set(self.prefix + key, etag.encode() + b'\n' + body, self.ttl)
+        return etag, body
+
+    async def invalidate(self, *keys: str):
+        for key in keys:
+            await self.backend.set(self.prefix + 'gen:' + key, secrets.token_bytes(8), self.ttl)
+        await self.backend.delete(*(self.prefix + key for key in keys))
+
+
+def make_backend() -> CacheBackend:
+    if not settings.CACHE_URL:
+        return MemoryBackend(maxsize=settings.CACHE_SIZE)
+    try:
+        from redis import asyncio as redis
+    except ImportError:
+        raise RuntimeError("CACHE_URL is set but the 'redis' package is not installed")
+    return RedisBackend(redis.from_url(settings.CACHE_URL))
+
+
+response_cache = ResponseCache(make_backend(), ttl=settings.CACHE_TTL)
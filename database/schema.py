@@ -0,0 +1,48 @@
+from pathlib import Path
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+# The schema is owned by the Alembic scripts in migrations/ (`alembic upgrade
+# head`). At startup the app only reads alembic_version and compares it with
+# the revision this code was written against; alembic itself is never
+# imported on that path.
+
+# Latest script in migrations/versions; test_migrations fails when they disagree
+SCHEMA_REVISION = '0006'
+
+ALEMBIC_INI = Path(__file__).resolve().parent.parent / 'alembic.ini'
+
+
+def alembic_config(database_url: str | None = None):
+    from alembic.config import Config
+
+    config = Config(str(ALEMBIC_INI))
+    config.attributes['configure_logger'] = False
+    if database_url:
+        config.set_main_option('sqlalchemy.url', database_url)
+    return config
+
+
+def stamp_head(connection):
+    # For databases built with metadata.create_all (tests, benchmark data), which match the latest revision
+    from alembic.migration import MigrationContext
+    from alembic.script import ScriptDirectory
+
+    script = ScriptDirectory.from_config(alembic_config())
+    MigrationContext.configure(connection).stamp(script, 'head')
+
+
+async def current_revision(engine: AsyncEngine) -> str | None:
+    async with engine.connect() as connection:
+        try:
+            return (await connection.execute(text("SELECT version_num FROM alembic_version"))).scalar()
+        except DBAPIError:
+            return None
+
+
+async def check_schema(engine: AsyncEngine):
+    revision = await current_revision(engine)
+    if revision != SCHEMA_REVISION:
+        raise RuntimeError(f"Database schema is at revision {revision or 'none'}, this code needs "
+                           f"{SCHEMA_REVISION}: run `alembic upgrade head`")
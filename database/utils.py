@@ -1,9 +1,17 @@
-import re
+from datetime import timedelta
+from .normalization import normalize_ingredient_name
 
 def format_ingredient_name(ingredient: str)-> str:
-    # 
-    ingredient = re.sub(r'[áéíóúÁÉÍÓÚ ]',
-                        lambda m: {'á': 'a', 'é': 'e', 'í': 'i', 'ó': 'o', 'ú': 'u',
-                              'Á': 'A', 'É': 'E', 'Í': 'I', 'Ó': 'O', 'Ú': 'U', " ": ""}[m.group()],
-                        ingredient.lower().strip())
-    return ingredient
\ No newline at end of file
+    # Memoized, see database/normalization.py
+    return normalize_ingredient_name(ingredient)
+
+def parse_duration(duration: str)-> timedelta:
+    # HH:MM:SS, raises ValueError otherwise
+    h, m, s = map(int, duration.split(':'))
+    return timedelta(hours=h, minutes=m, seconds=s)
+
+def format_duration(duration: timedelta)-> str:
+    # Inverse of parse_duration; hours go past 24 instead of rolling into days
+    minutes, seconds = divmod(int(duration.total_seconds()), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours:02}:{minutes:02}:{seconds:02}"
@@ -1,19 +1,49 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
+from sqlmodel.ext.asyncio.session import AsyncSession
 from routers import recipes, auth
-from database.database import create_db_and_tables, insert_test_data
+from database.database import engine, read_engine
+from database.schema import check_schema
+from database.recipes import build_ingredient_index
+from database.ingredient_search import build_ingredient_search_index
+from database.metrics import MetricsMiddleware, registry
+from database.hashing import password_pool
+from database.auth import token_cache
+from database.meal_plans import shopping_list_cache
 
 
-app = FastAPI()
+async def on_startup():
+    # One read of alembic_version; the schema itself comes from `alembic upgrade head`
+    await check_schema(engine)
+    async with AsyncSession(engine) as session:
+        await build_ingredient_index(session)
+        await build_ingredient_search_index(session)
 
-# Must be changed to Lifespan when SQLModel supports async
-@app.on_event("startup")
-def on_startup():
-    create_db_and_tables()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await on_startup()
+    yield
+    await engine.dispose()
+    await read_engine.dispose()
+
+
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(MetricsMiddleware)
+
+registry.register_stats('password_pool', password_pool.stats, counters=('completed', 'rejected', 'wait_seconds_total'))
+registry.register_stats('token_cache', token_cache.stats, counters=('hits', 'misses'))
+registry.register_stats('shopping_list_cache', shopping_list_cache.stats, counters=('hits', 'misses'))
 
 
 @app.get("/health")
 async def health_check():
     return {'status': 'Healthy'}
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
 app.include_router(recipes.router)
-app.include_router(auth.router)
\ No newline at end of file
+app.include_router(auth.router)
@@ -0,0 +1,126 @@
+"""Maintenance commands.
+
+    python manage.py import-recipes recipes.ndjson --owner-id 1 --chunk-size 1000
+    python manage.py normalize-ingredients
+    python manage.py rebuild-search
+    python manage.py rebuild-facets
+"""
+import argparse
+import asyncio
+import sys
+
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+
+async def file_lines(path: str):
+    with open(path, 'rb') as file:
+        for line in file:
+            yield line
+
+
+async def import_recipes_command(args):
+    from database.database import engine
+    from database.bulk_import import import_recipes
+
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        report = await import_recipes(file_lines(args.path), session, owner_id=args.owner_id,
+                                      chunk_size=args.chunk_size)
+    await engine.dispose()
+    print(f"Imported {report.imported} recipes, {report.failed} failed")
+    for error in report.errors:
+        print(f"  line {error.line}: {error.error}", file=sys.stderr)
+    return 1 if report.failed else 0
+
+
+async def normalize_ingredients_command(args):
+    # Rewrites names stored under older normalization rules. Names that would
+    # collide with an existing ingredient are reported and left untouched, so
+    # ids never change; running servers rebuild their ingredient search index
+    # once they see its version move.
+    from sqlmodel import select
+    from database.database import engine
+    from database.index_sync import bump_index_version
+    from database.ingredient_search import ingredient_search_index
+    from database.normalization import normalize_ingredient_names
+    from models.recipes import Ingredient
+
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        ingredients = (await session.exec(select(Ingredient))).all()
+        taken = {ingredient.name for ingredient in ingredients}
+        renamed, collisions = 0, 0
+        for ingredient, name in zip(ingredients, normalize_ingredient_names(i.name for i in ingredients)):
+            if name == ingredient.name:
+                continue
+            if name in taken:
+                collisions += 1
+                print(f"  {ingredient.name!r} -> {name!r} already exists (id {ingredient.id})", file=sys.stderr)
+                continue
+            taken.discard(ingredient.name)
+            taken.add(name)
+            ingredient.name = name
+            session.add(ingredient)
+            renamed += 1
+        if renamed:
+            await bump_index_version(ingredient_search_index.name, session)
+        await session.commit()
+    await engine.dispose()
+    print(f"Renamed {renamed} ingredients, {collisions} collisions")
+    return 1 if collisions else 0
+
+
+async def rebuild_search_command(args):
+    from database.database import engine
+    from database.recipe_search import rebuild_recipe_search
+
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        indexed = await rebuild_recipe_search(session)
+    await engine.dispose()
+    print(f"Indexed {indexed} recipes")
+    return 0
+
+
+async def rebuild_facets_command(args):
+    from database.database import engine
+    from database.facets import rebuild_facets
+
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        rows = await rebuild_facets(session)
+    await engine.dispose()
+    print(f"Rebuilt {rows} facet counts")
+    return 0
+
+
+def main(argv=None):
+    from database.core import settings
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    import_parser = commands.add_parser('import-recipes', help='Bulk import recipes from an NDJSON file',
+                                        description='Bulk import recipes from an NDJSON file. Running servers '
+                                                    'answer from SQL until their in-process indexes have '
+                                                    'been rebuilt with the new recipes, no restart needed.')
+    import_parser.add_argument('path')
+    import_parser.add_argument('--owner-id', type=int, default=None)
+    import_parser.add_argument('--chunk-size', type=int, default=settings.IMPORT_CHUNK_SIZE)
+    import_parser.set_defaults(handler=import_recipes_command)
+
+    normalize_parser = commands.add_parser('normalize-ingredients',
+                                           help='Re-normalize stored ingredient names with the current rules',
+                                           description='Re-normalize stored ingredient names with the current '
+                                                       'rules. Running servers rebuild their ingredient search '
+                                                       'index on their next read, no restart needed.')
+    normalize_parser.set_defaults(handler=normalize_ingredients_command)
+
+    search_parser = commands.add_parser('rebuild-search', help='Recreate the full-text recipe search index')
+    search_parser.set_defaults(handler=rebuild_search_command)
+
+    facets_parser = commands.add_parser('rebuild-facets', help='Recompute the recipe facet counts from scratch')
+    facets_parser.set_defaults(handler=rebuild_facets_command)
+
+    args = parser.parse_args(argv)
+    return asyncio.run(args.handler(args))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
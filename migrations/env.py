@@ -0,0 +1,61 @@
+import asyncio
+from logging.config import fileConfig
+
+from alembic import context
+from sqlalchemy import pool
+from sqlmodel import SQLModel
+
+import models.recipes  # noqa: F401 (tables for autogenerate)
+import models.auth  # noqa: F401
+
+config = context.config
+if config.config_file_name is not None and config.attributes.get('configure_logger', True):
+    fileConfig(config.config_file_name)
+
+target_metadata = SQLModel.metadata
+# Search structures are raw DDL (database.recipe_search, database.ingredient_search), not models
+UNMANAGED = ('recipe_fts', 'recipe_search', 'ix_ingredient_name_trgm')
+
+
+def include_name(name, type_, parent_names) -> bool:
+    return not (name or '').startswith(UNMANAGED)
+
+
+def database_url() -> str:
+    # Set programmatically (tests, scripts), otherwise the app's own setting
+    url = config.get_main_option('sqlalchemy.url')
+    if url:
+        return url
+    from database.core import settings
+    return settings.DATABASE_URL
+
+
+def run_migrations_offline():
+    context.configure(url=database_url(), target_metadata=target_metadata, literal_binds=True,
+                      dialect_opts={'paramstyle': 'named'}, render_as_batch=True, include_name=include_name)
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def do_run_migrations(connection):
+    # Batch mode so that ALTERs also work on SQLite
+    context.configure(connection=connection, target_metadata=target_metadata, render_as_batch=True,
+                      include_name=include_name)
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+async def run_migrations_online():
+    from sqlalchemy.ext.asyncio import create_async_engine
+    from database.database import async_database_url
+
+    connectable = create_async_engine(async_database_url(database_url()), poolclass=pool.NullPool)
+    async with connectable.connect() as connection:
+        await connection.run_sync(do_run_migrations)
+    await connectable.dispose()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    asyncio.run(run_migrations_online())
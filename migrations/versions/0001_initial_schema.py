@@ -0,0 +1,64 @@
+"""initial schema
+
+The tables as metadata.create_all built them before migrations existed.
+Databases created that way are already at this revision: `alembic stamp 0001`
+once, then `alembic upgrade head`.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18 19:21:42.163163
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('ingredient',
+                    sa.Column('name', sa.String(), nullable=False),
+                    sa.Column('id', sa.Integer(), nullable=False),
+                    sa.PrimaryKeyConstraint('id'))
+    op.create_index('ix_ingredient_name', 'ingredient', ['name'], unique=True)
+
+    op.create_table('user',
+                    sa.Column('name', sa.String(), nullable=False),
+                    sa.Column('surname', sa.String(), nullable=False),
+                    sa.Column('username', sa.String(), nullable=False),
+                    sa.Column('email', sa.String(), nullable=False),
+                    sa.Column('id', sa.Integer(), nullable=False),
+                    sa.Column('hashed_password', sa.String(), nullable=False),
+                    sa.Column('is_active', sa.Boolean(), nullable=True),
+                    sa.Column('is_superuser', sa.Boolean(), nullable=True),
+                    sa.PrimaryKeyConstraint('id'))
+    op.create_index('ix_user_username', 'user', ['username'], unique=True)
+
+    op.create_table('recipe',
+                    sa.Column('name', sa.String(), nullable=False),
+                    sa.Column('difficulty', sa.String(), nullable=False),
+                    sa.Column('recipe_type', sa.String(), nullable=True),
+                    sa.Column('steps', sa.String(length=200), nullable=True),
+                    sa.Column('id', sa.Integer(), nullable=False),
+                    sa.Column('duration', sa.Interval(), nullable=False),
+                    sa.Column('owner_id', sa.Integer(), nullable=True),
+                    sa.ForeignKeyConstraint(['owner_id'], ['user.id']),
+                    sa.PrimaryKeyConstraint('id'))
+    op.create_index('ix_recipe_name', 'recipe', ['name'], unique=False)
+
+    op.create_table('recipeingredientlink',
+                    sa.Column('recipe_id', sa.Integer(), nullable=False),
+                    sa.Column('ingredient_id', sa.Integer(), nullable=False),
+                    sa.ForeignKeyConstraint(['ingredient_id'], ['ingredient.id']),
+                    sa.ForeignKeyConstraint(['recipe_id'], ['recipe.id']),
+                    sa.PrimaryKeyConstraint('recipe_id', 'ingredient_id'))
+
+
+def downgrade():
+    op.drop_table('recipeingredientlink')
+    op.drop_table('recipe')
+    op.drop_table('user')
+    op.drop_table('ingredient')
@@ -0,0 +1,67 @@
+"""search indexes
+
+Full-text recipe search (FTS5 table on SQLite, weighted tsvector table on
+Postgres) filled from the existing recipes, and the pg_trgm index behind
+ingredient autocomplete on Postgres. The backfill does what
+`python manage.py rebuild-search` does.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19 10:02:11.402113
+"""
+from alembic import op
+import sqlalchemy as sa
+# A pure function, the same folding the app applies before indexing
+from database.normalization import fold_accents
+
+
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 1000
+
+recipe = sa.table('recipe', sa.column('id', sa.Integer), sa.column('name', sa.String),
+                  sa.column('recipe_type', sa.String), sa.column('steps', sa.String))
+
+INSERT_DOCUMENT = {
+    'sqlite': "INSERT INTO recipe_fts (rowid, name, recipe_type, steps) VALUES (:id, :name, :recipe_type, :steps)",
+    'postgresql': "INSERT INTO recipe_search (recipe_id, document) VALUES (:id, "
+                  "setweight(to_tsvector('simple', :name), 'A') || "
+                  "setweight(to_tsvector('simple', :recipe_type), 'B') || "
+                  "setweight(to_tsvector('simple', :steps), 'C'))",
+}
+
+
+def upgrade():
+    bind = op.get_bind()
+    dialect = bind.dialect.name
+    if dialect == 'sqlite':
+        op.execute("CREATE VIRTUAL TABLE IF NOT EXISTS recipe_fts USING fts5("
+                   "name, recipe_type, steps, tokenize = 'unicode61 remove_diacritics 2')")
+    elif dialect == 'postgresql':
+        op.execute("CREATE TABLE IF NOT EXISTS recipe_search ("
+                   "recipe_id INTEGER PRIMARY KEY REFERENCES recipe (id) ON DELETE CASCADE, "
+                   "document TSVECTOR NOT NULL)")
+        op.execute("CREATE INDEX IF NOT EXISTS ix_recipe_search_document ON recipe_search USING gin (document)")
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        op.execute("CREATE INDEX IF NOT EXISTS ix_ingredient_name_trgm ON ingredient USING gin (name gin_trgm_ops)")
+    else:
+        return
+
+    result = bind.execution_options(yield_per=BATCH_SIZE).execute(
+        sa.select(recipe.c.id, recipe.c.name, recipe.c.recipe_type, recipe.c.steps))
+    for rows in result.partitions():
+        bind.execute(sa.text(INSERT_DOCUMENT[dialect]), [
+            {"id": row.id, "name": fold_accents(row.name or ''), "recipe_type": fold_accents(row.recipe_type or ''),
+             "steps": fold_accents(row.steps or '')} for row in rows])
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        op.execute("DROP TABLE IF EXISTS recipe_fts")
+    elif dialect == 'postgresql':
+        op.execute("DROP INDEX IF EXISTS ix_ingredient_name_trgm")
+        op.execute("DROP TABLE IF EXISTS recipe_search")
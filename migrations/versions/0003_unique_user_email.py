@@ -0,0 +1,32 @@
+"""unique user email
+
+Signup and bulk provisioning rely on this index to settle races. Existing
+duplicates have to be resolved by hand first; the upgrade lists them and
+stops rather than picking an account to change.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19 10:04:37.918260
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+user = sa.table('user', sa.column('email', sa.String))
+
+
+def upgrade():
+    duplicates = op.get_bind().execute(
+        sa.select(user.c.email).group_by(user.c.email).having(sa.func.count() > 1).limit(20)).scalars().all()
+    if duplicates:
+        raise RuntimeError("Emails used by more than one user, fix them before upgrading: " + ", ".join(duplicates))
+    op.create_index('ix_user_email', 'user', ['email'], unique=True)
+
+
+def downgrade():
+    op.drop_index('ix_user_email', table_name='user')
@@ -0,0 +1,57 @@
+"""recipe facets
+
+Precomputed recipe counts per facet value, filled from the existing recipes
+the way `python manage.py rebuild-facets` does.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19 10:06:52.530811
+"""
+from datetime import timedelta
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+# Same buckets as database.facets.DURATION_BUCKETS at this revision
+DURATION_BUCKETS = ((timedelta(minutes=15), '0-15m'), (timedelta(minutes=30), '15-30m'),
+                    (timedelta(hours=1), '30-60m'), (timedelta(hours=2), '1-2h'), (None, '2h+'))
+
+recipe = sa.table('recipe', sa.column('id', sa.Integer), sa.column('difficulty', sa.String),
+                  sa.column('recipe_type', sa.String), sa.column('duration', sa.Interval))
+link = sa.table('recipeingredientlink', sa.column('recipe_id', sa.Integer), sa.column('ingredient_id', sa.Integer))
+
+
+def facet_queries():
+    duration = sa.case(*((recipe.c.duration <= bound, label) for bound, label in DURATION_BUCKETS[:-1]),
+                       else_=DURATION_BUCKETS[-1][1])
+    recipe_type = sa.func.coalesce(recipe.c.recipe_type, '')
+    return [
+        ('total', sa.select(sa.literal(''), sa.func.count()).select_from(recipe)),
+        ('difficulty', sa.select(recipe.c.difficulty, sa.func.count()).group_by(recipe.c.difficulty)),
+        ('recipe_type', sa.select(recipe_type, sa.func.count()).group_by(recipe_type)),
+        ('duration', sa.select(duration, sa.func.count()).group_by(duration)),
+        ('ingredient', sa.select(link.c.ingredient_id, sa.func.count()).group_by(link.c.ingredient_id)),
+    ]
+
+
+def upgrade():
+    facets = op.create_table('recipefacet',
+                             sa.Column('facet', sa.String(), nullable=False),
+                             sa.Column('value', sa.String(), nullable=False),
+                             sa.Column('count', sa.Integer(), nullable=False),
+                             sa.PrimaryKeyConstraint('facet', 'value'))
+    bind = op.get_bind()
+    for facet, query in facet_queries():
+        rows = [{"facet": facet, "value": str(value), "count": count} for value, count in bind.execute(query) if count]
+        if rows:
+            op.bulk_insert(facets, rows)
+
+
+def downgrade():
+    op.drop_table('recipefacet')
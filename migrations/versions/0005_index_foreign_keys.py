@@ -0,0 +1,27 @@
+"""index foreign keys
+
+Lookups by ingredient (recipes using it, facet rebuilds, ingredient deletion)
+and by owner scanned whole tables: the link table's primary key starts with
+recipe_id and recipe.owner_id had no index.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 19:21:44.927503
+"""
+from alembic import op
+
+
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_recipe_owner_id', 'recipe', ['owner_id'], unique=False)
+    op.create_index('ix_recipeingredientlink_ingredient_id', 'recipeingredientlink', ['ingredient_id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_recipeingredientlink_ingredient_id', table_name='recipeingredientlink')
+    op.drop_index('ix_recipe_owner_id', table_name='recipe')
@@ -0,0 +1,33 @@
+"""index versions
+
+A counter per in-process index (ingredient_index, ingredient_search), bumped
+by the writes that change it, so that every worker can tell when its copy
+missed a change made by another process.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18 21:02:17.381920
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+# Same names as models.recipes.INDEX_NAMES at this revision
+INDEX_NAMES = ('ingredient_index', 'ingredient_search')
+
+
+def upgrade():
+    versions = op.create_table('indexversion',
+                               sa.Column('name', sa.String(), nullable=False),
+                               sa.Column('version', sa.Integer(), nullable=False),
+                               sa.PrimaryKeyConstraint('name'))
+    op.bulk_insert(versions, [{"name": name, "version": 0} for name in INDEX_NAMES])
+
+
+def downgrade():
+    op.drop_table('indexversion')
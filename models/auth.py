@@ -4,7 +4,7 @@ class UserBase(SQLModel):
     name: str
     surname: str
     username: str = Field(index=True, unique=True)
-    email: str
+    email: str = Field(index=True, unique=True)
     
 class User(UserBase, table=True):
     id: int | None = Field(default=None, primary_key=True)
@@ -14,4 +14,8 @@ class User(UserBase, table=True):
     
 class UserCreate(UserBase):
     password: str
+
+class UserProvision(UserBase):
+    # Accounts created by the SSO sync have no local password
+    pass
     
\ No newline at end of file
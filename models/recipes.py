@@ -1,3 +1,4 @@
+from sqlalchemy import DDL, event
 from sqlmodel import SQLModel, Field, Relationship
 from pydantic import field_validator
 from datetime import timedelta
@@ -5,7 +6,8 @@ from database.utils import format_ingredient_name
 
 class RecipeIngredientLink(SQLModel, table=True):
     recipe_id: int | None = Field(default=None, foreign_key="recipe.id", primary_key=True)
-    ingredient_id: int | None = Field(default=None, foreign_key="ingredient.id", primary_key=True)
+    # Own index: the primary key only serves lookups that start with recipe_id
+    ingredient_id: int | None = Field(default=None, foreign_key="ingredient.id", primary_key=True, index=True)
 
 # Recipes
 
@@ -19,9 +21,11 @@ class RecipeBase(SQLModel):
 class Recipe(RecipeBase, table=True):
     id: int | None = Field(default=None, primary_key=True)
     duration: timedelta
-    owner_id : int | None = Field(default=None, foreign_key="user.id")
+    owner_id : int | None = Field(default=None, foreign_key="user.id", index=True)
     
-    ingredients: list["Ingredient"] = Relationship(back_populates="recipes", link_model=RecipeIngredientLink)
+    # Ordered so that responses with ingredients list them the same way every time
+    ingredients: list["Ingredient"] = Relationship(back_populates="recipes", link_model=RecipeIngredientLink,
+                                                   sa_relationship_kwargs={"order_by": "Ingredient.id"})
     
 class RecipeCreate(RecipeBase):
     duration: str
@@ -63,8 +67,7 @@ class IngredientBase(SQLModel):
     @field_validator('name')
     @classmethod
     def validate_name(cls, v: str):
-        format_ingredient_name(v)
-        return v
+        return format_ingredient_name(v)
     
 class Ingredient(IngredientBase, table=True):
     id: int | None = Field(default=None, primary_key=True)
@@ -77,3 +80,114 @@ class IngredientCreate(IngredientBase):
 
 class IngredientPublic(IngredientBase):
     id: int
+
+class RecipeWithIngredients(RecipePublic):
+    # Only build it from recipes loaded with selectinload(Recipe.ingredients)
+    ingredients: list[IngredientPublic]
+
+class IngredientSuggestion(SQLModel):
+    id: int
+    name: str
+    score: float
+
+# Listing
+
+class RecipePage(SQLModel):
+    results: list[RecipeWithIngredients | RecipePublic]
+    next_cursor: str | None = None
+
+class RecipeBatch(SQLModel):
+    results: list[RecipeWithIngredients | RecipePublic]
+    missing: list[int]
+
+class IngredientPage(SQLModel):
+    results: list[IngredientPublic]
+    next_cursor: str | None = None
+
+# Pantry search
+
+class RecipeMatch(SQLModel):
+    recipe: RecipeWithIngredients | RecipePublic
+    matched: int
+    required: int
+    missing: int
+    coverage: float
+
+class RecipeMatchPage(SQLModel):
+    results: list[RecipeMatch]
+    next_cursor: str | None = None
+
+# Full-text search
+
+class RecipeSearchHit(SQLModel):
+    recipe: RecipeWithIngredients | RecipePublic
+    score: float
+
+class RecipeSearchPage(SQLModel):
+    results: list[RecipeSearchHit]
+    next_offset: int | None = None
+
+# Facets
+
+class RecipeFacet(SQLModel, table=True):
+    # Precomputed recipe counts per facet value, kept up to date by the write endpoints
+    facet: str = Field(primary_key=True)
+    value: str = Field(primary_key=True)
+    count: int = 0
+
+# In-process indexes
+
+class IndexVersion(SQLModel, table=True):
+    # One counter per in-process index, bumped by every write that changes what it holds
+    name: str = Field(primary_key=True)
+    version: int = 0
+
+INDEX_NAMES = ('ingredient_index', 'ingredient_search')
+
+# create_all (tests, benchmark data) gets the rows the migration inserts
+event.listen(IndexVersion.__table__, 'after_create',
+             DDL("INSERT INTO indexversion (name, version) VALUES "
+                 + ", ".join(f"('{name}', 0)" for name in INDEX_NAMES)))
+
+class FacetCount(SQLModel):
+    value: str | None
+    count: int
+
+class IngredientFacetCount(SQLModel):
+    id: int
+    name: str
+    count: int
+
+class RecipeFacets(SQLModel):
+    total: int
+    difficulty: list[FacetCount]
+    recipe_type: list[FacetCount]
+    duration: list[FacetCount]
+    ingredients: list[IngredientFacetCount]
+
+# Meal plans
+
+class MealPlanEntry(SQLModel):
+    recipe_id: int
+    servings: int = Field(default=1, ge=1, le=1000)
+
+class ShoppingListItem(SQLModel):
+    name: str
+    servings: int
+    recipes: list[int]
+
+class ShoppingList(SQLModel):
+    items: list[ShoppingListItem]
+    total_duration: str
+    missing: list[int]
+
+# Bulk import
+
+class RecipeImportError(SQLModel):
+    line: int
+    error: str
+
+class RecipeImportReport(SQLModel):
+    imported: int = 0
+    failed: int = 0
+    errors: list[RecipeImportError] = []
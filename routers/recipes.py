@@ -1,6 +1,9 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Request
+from fastapi.responses import Response, StreamingResponse
+from typing import Annotated, Literal
 from starlette import status
-from database.database import get_session
+from database.database import get_session, get_read_session
+from database.core import settings
 
 
 router = APIRouter(
@@ -11,79 +14,207 @@ router = APIRouter(
 
 
 # SQLModel
-from sqlalchemy import and_
-from sqlmodel import Session, select
+from sqlmodel import select
+from sqlalchemy.orm import selectinload
+from sqlmodel.ext.asyncio.session import AsyncSession
 from models.recipes import *
 from database.auth import user_dependency
-from database.utils import format_ingredient_name
+from database.utils import format_ingredient_name, parse_duration
+from database.recipes import (recipe_ids_with_all_ingredients, get_recipes_by_ids, get_recipes_in_order, recipe_coverage,
+                              top_k_by_coverage, encode_cursor, decode_cursor, recipe_list_query,
+                              ingredient_list_query, stream_ndjson, with_ingredients_option)
+from database.ingredient_index import ingredient_index
+from database.index_sync import bump_index_version, catch_up
+from database.ingredient_search import ingredient_search_index, search_ingredients
+from database.bulk_import import import_recipes, iter_lines
+from database.recipe_search import index_recipes, unindex_recipe, search_recipe_ids
+from database.facets import (update_facets, recipe_facet_values, recipe_ingredient_ids, remove_ingredient_facet,
+                             get_facets, get_filtered_facets)
+from database.meal_plans import get_shopping_list, invalidate_shopping_lists
+from database.response_cache import response_cache, etag_matches
 from schemas.auth import UserDataForJWT
 
 
 # Remind to change endpoint's names
 
+# Recipes per batch request; fits in one IN (...) query (database.recipes.IN_CHUNK_SIZE)
+MAX_BATCH_IDS = 100
+# Entries per meal plan, also under IN_CHUNK_SIZE
+MAX_PLAN_ENTRIES = 200
+
+def decode_id_cursor(cursor: str | None) -> int | None:
+    if cursor is None:
+        return None
+    try:
+        return decode_cursor(cursor, 1)[0]
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+async def read_page(query, limit: int, session: AsyncSession) -> tuple[list, str | None]:
+    rows = (await session.exec(query.limit(limit + 1))).all()
+    next_cursor = encode_cursor(rows[limit - 1].id) if len(rows) > limit else None
+    return rows[:limit], next_cursor
+
+async def cached_json(request: Request, key: str, public_model, load) -> Response:
+    # Read-through: only a cache miss calls load(), and a matching If-None-Match never reaches the DB
+    entry = await response_cache.get(key)
+    if entry is None:
+        generation = await response_cache.generation(key)
+        body = public_model.model_validate(await load()).model_dump_json().encode()
+        entry = await response_cache.set(key, body, generation)
+    etag, body = entry
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    return Response(content=body, media_type="application/json", headers={"ETag": etag})
+
+def recipe_model(with_ingredients: bool):
+    return RecipeWithIngredients if with_ingredients else RecipePublic
+
+# Listings
+
+@router.get("/", status_code=status.HTTP_200_OK, response_model=RecipePage)
+async def list_recipes(cursor: str | None = None, limit: int = Query(default=50, ge=1, le=500),
+                       difficulty: str | None = None, recipe_type: str | None = None,
+                       max_duration: str | None = Query(default=None, description="HH:MM:SS"),
+                       format: Literal["json", "ndjson"] = "json", with_ingredients: bool = False,
+                       session: AsyncSession = Depends(get_read_session)):
+    if max_duration is not None:
+        try:
+            max_duration = parse_duration(max_duration)
+        except ValueError:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid duration format. Use HH:MM:SS")
+    query = with_ingredients_option(recipe_list_query(decode_id_cursor(cursor), difficulty, recipe_type, max_duration),
+                                    with_ingredients)
+    public_model = recipe_model(with_ingredients)
+    if format == "ndjson":
+        # Full export from the cursor onwards, limit does not apply
+        return StreamingResponse(stream_ndjson(query, public_model, session), media_type="application/x-ndjson")
+    results, next_cursor = await read_page(query, limit, session)
+    return RecipePage(results=[public_model.model_validate(recipe) for recipe in results], next_cursor=next_cursor)
+
+@router.get("/mine", status_code=status.HTTP_200_OK, response_model=RecipePage)
+async def list_my_recipes(*, cursor: str | None = None, limit: int = Query(default=50, ge=1, le=500),
+                          with_ingredients: bool = False, session: AsyncSession = Depends(get_read_session),
+                          user: user_dependency):
+    query = with_ingredients_option(recipe_list_query(decode_id_cursor(cursor), owner_id=user.id), with_ingredients)
+    results, next_cursor = await read_page(query, limit, session)
+    public_model = recipe_model(with_ingredients)
+    return RecipePage(results=[public_model.model_validate(recipe) for recipe in results], next_cursor=next_cursor)
+
+@router.get("/batch", status_code=status.HTTP_200_OK, response_model=RecipeBatch)
+async def read_recipes_batch(ids: list[int] = Query(min_length=1, max_length=MAX_BATCH_IDS),
+                             with_ingredients: bool = False, session: AsyncSession = Depends(get_read_session)):
+    # ?ids=3&ids=1: one query for a whole feed, results in the order asked for
+    recipes, missing = await get_recipes_in_order(ids, session, with_ingredients)
+    public_model = recipe_model(with_ingredients)
+    return RecipeBatch(results=[public_model.model_validate(recipe) for recipe in recipes], missing=missing)
+
+@router.get("/ingredients", status_code=status.HTTP_200_OK, response_model=IngredientPage)
+async def list_ingredients(cursor: str | None = None, limit: int = Query(default=50, ge=1, le=500),
+                           format: Literal["json", "ndjson"] = "json",
+                           session: AsyncSession = Depends(get_read_session)):
+    query = ingredient_list_query(decode_id_cursor(cursor))
+    if format == "ndjson":
+        return StreamingResponse(stream_ndjson(query, IngredientPublic, session), media_type="application/x-ndjson")
+    results, next_cursor = await read_page(query, limit, session)
+    return IngredientPage(results=results, next_cursor=next_cursor)
+
 # Ingredients
 
 @router.post("/create_ingredient", status_code=status.HTTP_201_CREATED, response_model=IngredientPublic)
-async def create_ingredient_sqlmodel(*, ingredient_data: IngredientCreate, session: Session = Depends(get_session),
+async def create_ingredient_sqlmodel(*, ingredient_data: IngredientCreate, session: AsyncSession = Depends(get_session),
                                      user: user_dependency):
     
-    ingredient_data.name = format_ingredient_name(ingredient_data.name)
-    db_ingredient = session.exec(select(Ingredient).where(Ingredient.name == ingredient_data.name)).first()
+    db_ingredient = (await session.exec(select(Ingredient).where(Ingredient.name == ingredient_data.name))).first()
     print(db_ingredient)
     if db_ingredient:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Ingredient already exists")
     
     new_ingredient = Ingredient.model_validate(ingredient_data)
     session.add(new_ingredient)
-    session.commit()
-    session.refresh(new_ingredient)
+    version = await bump_index_version(ingredient_search_index.name, session)
+    await session.commit()
+    await session.refresh(new_ingredient)
+    await response_cache.invalidate(f"ingredient:name:{new_ingredient.name}")
+    if catch_up(ingredient_search_index, version):
+        ingredient_search_index.add(new_ingredient.id, new_ingredient.name)
     return new_ingredient
 
+@router.get("/ingredient_search", status_code=status.HTTP_200_OK, response_model=list[IngredientSuggestion])
+async def ingredient_search(q: str = Query(min_length=1, max_length=100), limit: int = Query(default=10, ge=1, le=50),
+                            session: AsyncSession = Depends(get_read_session)):
+    # Autocomplete and typo tolerant: 'tom' and 'tomatoe' both suggest 'tomate'
+    return [IngredientSuggestion(id=ingredient_id, name=name, score=score)
+            for ingredient_id, name, score in await search_ingredients(q, limit, session)]
+
 @router.get("/ingredient_by_name/{ingredient_name}", status_code=status.HTTP_200_OK, response_model=IngredientPublic)
-async def ingredient_by_name(ingredient_name: str, session: Session = Depends(get_session)):
+async def ingredient_by_name(ingredient_name: str, request: Request, session: AsyncSession = Depends(get_read_session)):
     ingredient_name = format_ingredient_name(ingredient_name)
-    db_ingredient = session.exec(select(Ingredient).where(Ingredient.name == ingredient_name)).first()
-    if not db_ingredient:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Ingredient not found")
-    return db_ingredient
+
+    async def load():
+        db_ingredient = (await session.exec(select(Ingredient).where(Ingredient.name == ingredient_name))).first()
+        if not db_ingredient:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Ingredient not found")
+        return db_ingredient
+    return await cached_json(request, f"ingredient:name:{ingredient_name}", IngredientPublic, load)
 
 @router.get("/ingredient_by_id/{ingredient_id}", status_code=status.HTTP_200_OK, response_model=IngredientPublic)
-async def ingredient_by_id(ingredient_id: int, session: Session = Depends(get_session)):
-    db_ingredient = session.get(Ingredient, ingredient_id)
-    if not db_ingredient:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Ingredient not found")
-    return db_ingredient
+async def ingredient_by_id(ingredient_id: int, request: Request, session: AsyncSession = Depends(get_read_session)):
+    async def load():
+        db_ingredient = await session.get(Ingredient, ingredient_id)
+        if not db_ingredient:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Ingredient not found")
+        return db_ingredient
+    return await cached_json(request, f"ingredient:id:{ingredient_id}", IngredientPublic, load)
 
 @router.delete("/delete_ingredient_by_name/{ingredient_name}", status_code=status.HTTP_200_OK)
-async def delete_ingredient_sqlmodel(*, ingredient_name: str, session: Session = Depends(get_session),
+async def delete_ingredient_sqlmodel(*, ingredient_name: str, session: AsyncSession = Depends(get_session),
                                      user: user_dependency):
     ingredient_name = format_ingredient_name(ingredient_name)
-    db_ingredient = session.exec(select(Ingredient).where(Ingredient.name == ingredient_name)).first()
+    db_ingredient = (await session.exec(select(Ingredient).where(Ingredient.name == ingredient_name))).first()
     if not db_ingredient:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Ingredient not found")
     print(type(user.is_superuser))
     if user.is_superuser:
-        session.delete(db_ingredient)
-        session.commit()
+        await remove_ingredient_facet(db_ingredient.id, session)
+        await session.delete(db_ingredient)
+        version = await bump_index_version(ingredient_index.name, session)
+        search_version = await bump_index_version(ingredient_search_index.name, session)
+        await session.commit()
+        if catch_up(ingredient_index, version):
+            ingredient_index.remove_ingredient(db_ingredient.id)
+        if catch_up(ingredient_search_index, search_version):
+            ingredient_search_index.remove(db_ingredient.id)
+        invalidate_shopping_lists(ingredient_ids=[db_ingredient.id])
+        await response_cache.invalidate(f"ingredient:id:{db_ingredient.id}", f"ingredient:name:{db_ingredient.name}")
         return
     raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="This user is not authorized")
     
 @router.delete("/delete_ingredient/{ingredient_id}", status_code=status.HTTP_200_OK)
-async def delete_ingredient_by_id(*, ingredient_id: int, session: Session = Depends(get_session),
+async def delete_ingredient_by_id(*, ingredient_id: int, session: AsyncSession = Depends(get_session),
                                   user: user_dependency):
-    db_ingredient = session.get(Ingredient, ingredient_id)
+    db_ingredient = await session.get(Ingredient, ingredient_id)
     if not db_ingredient:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Ingredient not found")
     if user.is_superuser == True:
-        session.delete(db_ingredient)
-        session.commit()
+        await remove_ingredient_facet(db_ingredient.id, session)
+        await session.delete(db_ingredient)
+        version = await bump_index_version(ingredient_index.name, session)
+        search_version = await bump_index_version(ingredient_search_index.name, session)
+        await session.commit()
+        if catch_up(ingredient_index, version):
+            ingredient_index.remove_ingredient(ingredient_id)
+        if catch_up(ingredient_search_index, search_version):
+            ingredient_search_index.remove(ingredient_id)
+        invalidate_shopping_lists(ingredient_ids=[ingredient_id])
+        await response_cache.invalidate(f"ingredient:id:{ingredient_id}", f"ingredient:name:{db_ingredient.name}")
         return
     raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="This user is not authorized")
 
 # Recipes
 
 @router.post("/create_recipe", status_code=status.HTTP_201_CREATED, response_model=RecipePublic)
-async def create_recipe(*, recipe_data: RecipeCreate, session: Session = Depends(get_session),
+async def create_recipe(*, recipe_data: RecipeCreate, session: AsyncSession = Depends(get_session),
                                  user: user_dependency):
     new_recipe = Recipe(
         name= recipe_data.name,
@@ -94,99 +225,220 @@ async def create_recipe(*, recipe_data: RecipeCreate, session: Session = Depends
         owner_id= user.id
     )
     recipe_ingredients = []
+    new_ingredients = []
+    # Names already normalized by IngredientBase.validate_name
     for ingredient in recipe_data.ingredients:
-        ingredient.name = format_ingredient_name(ingredient.name)
-        db_ingredient = session.exec(select(Ingredient).where(Ingredient.name == ingredient.name)).first()
+        db_ingredient = (await session.exec(select(Ingredient).where(Ingredient.name == ingredient.name))).first()
         if db_ingredient is None:
             db_ingredient = Ingredient(name=ingredient.name)
+            new_ingredients.append(db_ingredient)
         recipe_ingredients.append(db_ingredient)
     new_recipe.ingredients = recipe_ingredients
     
     
     session.add(new_recipe)
-    session.commit()
-    session.refresh(new_recipe)
+    await session.flush()
+    ingredient_ids = [ingredient.id for ingredient in recipe_ingredients]
+    await index_recipes([new_recipe], session)
+    await update_facets(session, added=recipe_facet_values(new_recipe, ingredient_ids))
+    version = await bump_index_version(ingredient_index.name, session)
+    if new_ingredients:
+        search_version = await bump_index_version(ingredient_search_index.name, session)
+    await session.commit()
+    await session.refresh(new_recipe)
+    if catch_up(ingredient_index, version):
+        ingredient_index.add_recipe(new_recipe.id, ingredient_ids)
+    invalidate_shopping_lists(recipe_ids=[new_recipe.id])
+    if new_ingredients and catch_up(ingredient_search_index, search_version):
+        for ingredient in new_ingredients:
+            ingredient_search_index.add(ingredient.id, ingredient.name)
     return new_recipe
 
-@router.get("/recipe_by_name/{recipe_name}", status_code=status.HTTP_200_OK, response_model=RecipePublic)
-async def recipe_by_name(recipe_name: str, session: Session = Depends(get_session)):
-    db_recipe = session.exec(select(Recipe).where(Recipe.name == recipe_name)).first()
-    if not db_recipe:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Recipe not found")
-    return db_recipe
+@router.post("/bulk_import", status_code=status.HTTP_200_OK, response_model=RecipeImportReport)
+async def bulk_import_recipes(*, request: Request, chunk_size: int = Query(default=settings.IMPORT_CHUNK_SIZE, ge=1, le=10000),
+                              session: AsyncSession = Depends(get_session), user: user_dependency):
+    # Body is NDJSON: one RecipeCreate object per line, read as it arrives
+    return await import_recipes(iter_lines(request.stream()), session, owner_id=user.id, chunk_size=chunk_size)
 
-@router.get("/{recipe_id}", status_code=status.HTTP_200_OK, response_model=RecipePublic)
-async def read_recipe_by_id(recipe_id: int, session: Session = Depends(get_session)):
-    db_recipe = session.get(Recipe, recipe_id)
-    if not db_recipe:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Recipe not found")
-    return db_recipe
+@router.get("/facets", status_code=status.HTTP_200_OK, response_model=RecipeFacets)
+async def recipe_facets(ingredients: list[str] = Query(default=[], description="Only recipes using all of these"),
+                        top_ingredients: int = Query(default=20, ge=0, le=200),
+                        session: AsyncSession = Depends(get_read_session)):
+    if not ingredients:
+        return await get_facets(session, top_ingredients)
+    names = {format_ingredient_name(name) for name in ingredients}
+    ingredient_ids = (await session.exec(select(Ingredient.id).where(Ingredient.name.in_(names)))).all()
+    if len(ingredient_ids) != len(names):
+        # Some ingredient does not exist, so no recipe can use all of them
+        return RecipeFacets(total=0, difficulty=[], recipe_type=[], duration=[], ingredients=[])
+    return await get_filtered_facets(list(ingredient_ids), session, top_ingredients)
+
+@router.get("/search", status_code=status.HTTP_200_OK, response_model=RecipeSearchPage)
+async def search_recipes(q: str = Query(min_length=1, max_length=200), limit: int = Query(default=20, ge=1, le=100),
+                         offset: int = Query(default=0, ge=0, le=10000), with_ingredients: bool = False,
+                         session: AsyncSession = Depends(get_read_session)):
+    # Ranked by relevance, so paged by offset rather than by id cursor
+    hits = await search_recipe_ids(q, limit + 1, offset, session)
+    recipes = {recipe.id: recipe for recipe in await get_recipes_by_ids([hit[0] for hit in hits[:limit]], session,
+                                                                        with_ingredients)}
+    public_model = recipe_model(with_ingredients)
+    results = [RecipeSearchHit(recipe=public_model.model_validate(recipes[recipe_id]), score=score)
+               for recipe_id, score in hits[:limit] if recipe_id in recipes]
+    return RecipeSearchPage(results=results, next_offset=offset + limit if len(hits) > limit else None)
+
+@router.post("/shopping_list", status_code=status.HTTP_200_OK, response_model=ShoppingList)
+async def shopping_list(plan: Annotated[list[MealPlanEntry], Body(min_length=1, max_length=MAX_PLAN_ENTRIES)],
+                        session: AsyncSession = Depends(get_read_session)):
+    # Merged ingredients and total cooking time of a meal plan; the same recipe may be planned several times
+    return await get_shopping_list(plan, session)
+
+# Responses with ingredients skip the response cache: deleting an ingredient would have to invalidate every recipe using it
+
+@router.get("/recipe_by_name/{recipe_name}", status_code=status.HTTP_200_OK,
+            response_model=RecipeWithIngredients | RecipePublic)
+async def recipe_by_name(recipe_name: str, request: Request, with_ingredients: bool = False,
+                         session: AsyncSession = Depends(get_read_session)):
+    async def load():
+        query = with_ingredients_option(select(Recipe).where(Recipe.name == recipe_name), with_ingredients)
+        db_recipe = (await session.exec(query)).first()
+        if not db_recipe:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Recipe not found")
+        return db_recipe
+    if with_ingredients:
+        return RecipeWithIngredients.model_validate(await load())
+    return await cached_json(request, f"recipe:name:{recipe_name}", RecipePublic, load)
+
+@router.get("/{recipe_id}", status_code=status.HTTP_200_OK, response_model=RecipeWithIngredients | RecipePublic)
+async def read_recipe_by_id(recipe_id: int, request: Request, with_ingredients: bool = False,
+                            session: AsyncSession = Depends(get_read_session)):
+    async def load():
+        options = [selectinload(Recipe.ingredients)] if with_ingredients else None
+        db_recipe = await session.get(Recipe, recipe_id, options=options)
+        if not db_recipe:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Recipe not found")
+        return db_recipe
+    if with_ingredients:
+        return RecipeWithIngredients.model_validate(await load())
+    return await cached_json(request, f"recipe:id:{recipe_id}", RecipePublic, load)
 
 # ***
-@router.post("/recipe_by_ingredients", status_code=status.HTTP_200_OK, response_model=list[RecipePublic])
-async def read_recipe_by_ingredients(ingredient_list: list[IngredientBase],
-                                     session: Session = Depends(get_session)):
+@router.post("/recipe_by_ingredients", status_code=status.HTTP_200_OK,
+             response_model=list[RecipeWithIngredients | RecipePublic])
+async def read_recipe_by_ingredients(ingredient_list: list[IngredientBase], with_ingredients: bool = False,
+                                     session: AsyncSession = Depends(get_read_session)):
     # Busqueda de ingredientes en DB
-    ingredient_names = [format_ingredient_name(ingredient.name) for ingredient in ingredient_list]
+    ingredient_names = [ingredient.name for ingredient in ingredient_list]
 
-    db_ingredients = session.exec(select(Ingredient).where(Ingredient.name.in_(ingredient_names))).all()
+    db_ingredients = (await session.exec(select(Ingredient).where(Ingredient.name.in_(ingredient_names)))).all()
         
     if len(db_ingredients) != len(ingredient_list):
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Some ingredients not found")
     
     # Busqueda de receta en DB en base a los ingredientes
-    db_recipe = session.exec(select(Recipe).where(
-        and_(*[Recipe.ingredients.contains(ingredient) for ingredient in db_ingredients]))
-        ).all()
+    recipe_ids = await recipe_ids_with_all_ingredients([ingredient.id for ingredient in db_ingredients], session)
+    db_recipe = await get_recipes_by_ids(recipe_ids, session, with_ingredients)
     if not db_recipe:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No recipes found whit these ingredients")
-    return db_recipe
+    public_model = recipe_model(with_ingredients)
+    return [public_model.model_validate(recipe) for recipe in db_recipe]
+
+@router.post("/what_can_i_cook", status_code=status.HTTP_200_OK, response_model=RecipeMatchPage)
+async def what_can_i_cook(pantry: list[IngredientBase], limit: int = Query(default=10, ge=1, le=100),
+                          cursor: str | None = None, with_ingredients: bool = False,
+                          session: AsyncSession = Depends(get_read_session)):
+    after = None
+    if cursor is not None:
+        try:
+            after = decode_cursor(cursor, 3)
+        except ValueError:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+        if after[2] < 1:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+    # Unknown ingredients simply do not match anything
+    ingredient_names = {ingredient.name for ingredient in pantry}
+    ingredient_ids = (await session.exec(select(Ingredient.id).where(Ingredient.name.in_(ingredient_names)))).all()
+
+    page = top_k_by_coverage(await recipe_coverage(ingredient_ids, session), limit + 1, after)
+    has_more = len(page) > limit
+    page = page[:limit]
+    recipes = {recipe.id: recipe for recipe in await get_recipes_by_ids([row[0] for row in page], session,
+                                                                        with_ingredients)}
+    public_model = recipe_model(with_ingredients)
+    results = [RecipeMatch(recipe=public_model.model_validate(recipes[recipe_id]), matched=matched, required=required,
+                           missing=required - matched, coverage=matched / required)
+               for recipe_id, matched, required in page if recipe_id in recipes]
+    next_cursor = encode_cursor(*page[-1]) if has_more else None
+    return RecipeMatchPage(results=results, next_cursor=next_cursor)
 
 @router.delete("/delete_recipe_by_name/{recipe_name}", status_code=status.HTTP_200_OK)
-async def delete_recipe_by_name(*, recipe_name: str, session: Session = Depends(get_session),
+async def delete_recipe_by_name(*, recipe_name: str, session: AsyncSession = Depends(get_session),
                                 user: user_dependency):
-    db_recipe = session.exec(select(Recipe).where(Recipe.name == recipe_name)).first()
+    db_recipe = (await session.exec(select(Recipe).where(Recipe.name == recipe_name))).first()
     if not db_recipe:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Recipe not found")
     if user.id == db_recipe.owner_id or user.is_superuser == True:
-        session.delete(db_recipe)
-        session.commit()
+        recipe_id = db_recipe.id
+        await unindex_recipe(recipe_id, session)
+        ingredient_ids = await recipe_ingredient_ids(recipe_id, session)
+        await update_facets(session, removed=recipe_facet_values(db_recipe, ingredient_ids))
+        await session.delete(db_recipe)
+        version = await bump_index_version(ingredient_index.name, session)
+        await session.commit()
+        if catch_up(ingredient_index, version):
+            ingredient_index.remove_recipe(recipe_id)
+        invalidate_shopping_lists(recipe_ids=[recipe_id])
+        await response_cache.invalidate(f"recipe:id:{recipe_id}", f"recipe:name:{db_recipe.name}")
         return
     raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="This user is not authorized")
     
 @router.delete("/delete_recipe/{recipe_id}", status_code=status.HTTP_200_OK)
-async def delete_recipe_by_id(*, recipe_id: int, session: Session = Depends(get_session),
+async def delete_recipe_by_id(*, recipe_id: int, session: AsyncSession = Depends(get_session),
                               user: user_dependency):
-    db_recipe = session.get(Recipe, recipe_id)
+    db_recipe = await session.get(Recipe, recipe_id)
     if not db_recipe:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Recipe not found")
     if user.id == db_recipe.owner_id or user.is_superuser == True:
-        session.delete(db_recipe)
-        session.commit()
+        recipe_id = db_recipe.id
+        await unindex_recipe(recipe_id, session)
+        ingredient_ids = await recipe_ingredient_ids(recipe_id, session)
+        await update_facets(session, removed=recipe_facet_values(db_recipe, ingredient_ids))
+        await session.delete(db_recipe)
+        version = await bump_index_version(ingredient_index.name, session)
+        await session.commit()
+        if catch_up(ingredient_index, version):
+            ingredient_index.remove_recipe(recipe_id)
+        invalidate_shopping_lists(recipe_ids=[recipe_id])
+        await response_cache.invalidate(f"recipe:id:{recipe_id}", f"recipe:name:{db_recipe.name}")
         return
     raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="This user is not authorized")
     
 @router.patch("/update_recipe/{recipe_name}", status_code=status.HTTP_200_OK, response_model=RecipePublic)
 async def update_recipe(*, recipe_name: str, recipe_updated: RecipeUpdate, 
-                        session: Session = Depends(get_session),
+                        session: AsyncSession = Depends(get_session),
                         user: user_dependency):
-    db_recipe = session.exec(select(Recipe).where(Recipe.name == recipe_name)).first()
+    db_recipe = (await session.exec(select(Recipe).where(Recipe.name == recipe_name))).first()
     if not db_recipe:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Recipe not found")
     if user.id == db_recipe.owner_id or user.is_superuser == True:
+        old_facets = recipe_facet_values(db_recipe)
         db_recipe.sqlmodel_update(recipe_updated.model_dump(exclude_unset=True))
         session.add(db_recipe)
-        session.commit()
-        session.refresh(db_recipe)
+        await index_recipes([db_recipe], session)
+        await update_facets(session, added=recipe_facet_values(db_recipe), removed=old_facets)
+        await session.commit()
+        await session.refresh(db_recipe)
+        invalidate_shopping_lists(recipe_ids=[db_recipe.id])
+        await response_cache.invalidate(f"recipe:id:{db_recipe.id}", f"recipe:name:{recipe_name}",
+                                        f"recipe:name:{db_recipe.name}")
         return db_recipe
     raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="This user is not authorized")
 
 # Temporary
 
 @router.get("/get_recipe_by_id_user_dep/{recipe_id}", status_code=status.HTTP_200_OK, response_model=RecipePublic)
-async def get_recipe_by_id_user_dep(*, recipe_id: int, session: Session = Depends(get_session),
+async def get_recipe_by_id_user_dep(*, recipe_id: int, session: AsyncSession = Depends(get_read_session),
                                     user: user_dependency):
-    recipe = session.get(Recipe, recipe_id)
+    recipe = await session.get(Recipe, recipe_id)
     if not recipe:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Recipe not found")
     if user.id == recipe.owner_id or user.is_superuser == True:
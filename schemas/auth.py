@@ -18,4 +18,8 @@ class UserDataForJWT(BaseModel):
     email: str
     username: str
     is_superuser: bool
-    
+
+class UserProvisionReport(BaseModel):
+    created: int
+    # Usernames skipped because the username or the email already exists
+    skipped: list[str]
@@ -0,0 +1,109 @@
+import os
+from datetime import timedelta
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlalchemy.pool import NullPool
+from sqlmodel import SQLModel, Session, create_engine, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from main import app
+from database.database import get_session, get_read_session, create_db_engine
+from database.auth import create_access_token
+from database.ingredient_index import ingredient_index
+from database.ingredient_search import ingredient_search_index
+from database.response_cache import response_cache, MemoryBackend
+from models.auth import User
+from models.recipes import Recipe, Ingredient
+
+
+@pytest.fixture(autouse=True)
+def fresh_response_cache():
+    response_cache.backend = MemoryBackend(maxsize=1000)
+    yield
+
+
+@pytest.fixture(name="database_url")
+def database_url_fixture(tmp_path):
+    return f"sqlite:///{tmp_path / 'test.db'}"
+
+
+@pytest.fixture(name="session")
+def session_fixture(database_url):
+    # Synchronous session on the same file, for arranging data outside the app
+    engine = create_engine(database_url)
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        yield session
+    engine.dispose()
+    ingredient_index.clear()
+    ingredient_search_index.clear()
+
+
+@pytest.fixture(name="async_engine")
+def async_engine_fixture(database_url, session):
+    # NullPool: TestClient runs every request on a fresh event loop
+    return create_db_engine(database_url, poolclass=NullPool)
+
+
+@pytest.fixture(name="statements")
+def statements_fixture(async_engine):
+    # SQL emitted by the app through the test engine
+    executed = []
+    event.listen(async_engine.sync_engine, "before_cursor_execute",
+                 lambda conn, cursor, statement, *args: executed.append(statement))
+    return executed
+
+
+@pytest.fixture(name="client")
+def client_fixture(async_engine):
+    async def get_session_override():
+        async with AsyncSession(async_engine, expire_on_commit=False) as session:
+            yield session
+
+    app.dependency_overrides[get_session] = get_session_override
+    app.dependency_overrides[get_read_session] = get_session_override
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+
+
+@pytest.fixture(name="auth_headers")
+def auth_headers_fixture(session: Session):
+    user = User(name="Test", surname="User", username="tester", email="tester@example.com",
+                hashed_password="not-used", is_superuser=True)
+    session.add(user)
+    session.commit()
+    session.refresh(user)
+    token = create_access_token(username=user.username, user_id=user.id,
+                                email=user.email, is_superuser=user.is_superuser)
+    return {"Authorization": f"Bearer {token}"}
+
+
+@pytest.fixture(name="create_recipe")
+def create_recipe_fixture(client, auth_headers):
+    # Through the API, so the indexes, facets and caches see the recipe
+    def create(name: str, ingredients=(), **fields) -> dict:
+        response = client.post("/recipes/create_recipe", headers=auth_headers, json={
+            "name": name, "difficulty": "easy", "recipe_type": "main", "steps": "Cook",
+            "duration": "00:30:00", "ingredients": [{"name": i} for i in ingredients]} | fields)
+        assert response.status_code == 201
+        return response.json()
+    return create
+
+
+@pytest.fixture(name="add_recipe")
+def add_recipe_fixture(session: Session):
+    # Straight into the database: no validation (names are stored as given) and no app hooks
+    def add(name: str, ingredients=(), **fields) -> Recipe:
+        db_ingredients = [session.exec(select(Ingredient).where(Ingredient.name == i)).first() or Ingredient(name=i)
+                          for i in ingredients]
+        recipe = Recipe(**({"name": name, "difficulty": "easy", "recipe_type": "main", "steps": "Cook",
+                            "duration": timedelta(minutes=30)} | fields), ingredients=db_ingredients)
+        session.add(recipe)
+        session.commit()
+        session.refresh(recipe)
+        return recipe
+    return add
@@ -0,0 +1,160 @@
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+
+import pytest
+from fastapi import HTTPException
+from passlib.context import CryptContext
+from sqlmodel import select
+
+from database import auth
+from database.auth import bcrypt_context, create_access_token
+from database.core import settings
+from database.hashing import PasswordHasherPool
+from models.auth import User
+
+
+def test_signup_and_login(client):
+    user = {"name": "Ana", "surname": "Gil", "username": "ana", "email": "ana@example.com", "password": "secret"}
+    assert client.post("/auth/signup", json=user).status_code == 201
+    assert client.post("/auth/signup", json=user).status_code == 409
+    response = client.post("/auth/login", data={"username": "ana", "password": "secret"})
+    assert response.status_code == 200
+    assert response.json()["token_type"] == "bearer"
+    response = client.post("/auth/login", data={"username": "ana", "password": "wrong"})
+    assert response.status_code == 401
+
+
+def test_login_rehashes_weak_hash(client, session):
+    weak_hash = CryptContext(schemes=["bcrypt"], bcrypt__rounds=4).hash("secret")
+    session.add(User(name="Ana", surname="Gil", username="ana", email="ana@example.com", hashed_password=weak_hash))
+    session.commit()
+    assert bcrypt_context.needs_update(weak_hash)
+
+    response = client.post("/auth/login", data={"username": "ana", "password": "secret"})
+    assert response.status_code == 200
+    session.expire_all()
+    new_hash = session.exec(select(User.hashed_password).where(User.username == "ana")).one()
+    assert new_hash != weak_hash
+    assert not bcrypt_context.needs_update(new_hash)
+
+
+def test_password_pool_rejects_when_full():
+    pool = PasswordHasherPool(workers=1, max_pending=1)
+    release = threading.Event()
+
+    async def scenario():
+        running = asyncio.ensure_future(pool.run(release.wait))
+        await asyncio.sleep(0)
+        with pytest.raises(HTTPException) as excinfo:
+            await pool.run(release.wait)
+        release.set()
+        await running
+        return excinfo.value
+
+    error = asyncio.run(scenario())
+    assert error.status_code == 503
+    assert pool.stats()["rejected"] == 1
+    assert pool.stats()["completed"] == 1
+
+
+def test_password_pool_counts_finished_work_and_holds_slots_of_cancelled_callers():
+    pool = PasswordHasherPool(workers=1, max_pending=1)
+    started, release = threading.Event(), threading.Event()
+
+    def hash_password():
+        started.set()
+        release.wait()
+
+    async def scenario():
+        running = asyncio.ensure_future(pool.run(hash_password))
+        while not started.is_set():
+            await asyncio.sleep(0.01)
+        # Started, not finished
+        assert pool.stats()["completed"] == 0
+        running.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await running
+        # The worker thread is still hashing for the cancelled request
+        with pytest.raises(HTTPException):
+            await asyncio.wait_for(pool.run(hash_password), 1)
+        release.set()
+        while pool.stats()["pending"]:
+            await asyncio.sleep(0.01)
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        release.set()
+    assert pool.stats()["completed"] == 1
+
+
+def test_token_cache_and_logout(client, auth_headers):
+    from database.auth import token_cache
+    token_cache.clear()
+    hits = token_cache.hits
+    assert client.post("/auth/logout", headers=auth_headers).status_code == 204
+    # The first call validated and cached the token, logout then revoked it
+    assert token_cache.hits == hits
+    assert len(token_cache) == 0
+    assert client.post("/auth/logout", headers=auth_headers).status_code == 401
+
+
+def test_revocations_are_dropped_once_tokens_have_expired(monkeypatch):
+    monkeypatch.setattr(auth, "revoked_before", OrderedDict())
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now)
+    auth.revoke_user_tokens(1)
+    auth.revoke_user_tokens(2)
+    monkeypatch.setattr(time, "time", lambda: now + settings.ACCESS_TOKEN_EXPIRES * 60 / 2)
+    auth.revoke_user_tokens(1)
+    monkeypatch.setattr(time, "time", lambda: now + settings.ACCESS_TOKEN_EXPIRES * 60 + 1)
+    auth.revoke_user_tokens(3)
+    assert list(auth.revoked_before) == [1, 3]
+
+
+def test_signup_conflicts_use_one_query_and_survive_races(client, statements, monkeypatch):
+    user = {"name": "Ana", "surname": "Gil", "username": "ana", "email": "ana@example.com", "password": "secret"}
+    assert client.post("/auth/signup", json=user).status_code == 201
+
+    before = len(statements)
+    response = client.post("/auth/signup", json=user | {"username": "other"})
+    assert response.status_code == 409 and "email 'ana@example.com'" in response.json()["detail"]
+    assert len(statements) - before == 1
+
+    # A signup that passed the lookup before the other one committed hits the unique index instead
+    lookups = iter([None])
+    real_verify = auth.user_existence_verify
+
+    async def racing_verify(*args):
+        if next(lookups, "done") is None:
+            return
+        await real_verify(*args)
+    monkeypatch.setattr(auth, "user_existence_verify", racing_verify)
+    response = client.post("/auth/signup", json=user | {"email": "new@example.com"})
+    assert response.status_code == 409
+    assert response.json()["detail"] == "The username 'ana' is already taken. Please choose another"
+
+
+def test_bulk_provision_users(client, session, auth_headers):
+    users = [{"name": "User", "surname": str(i), "username": f"sso{i}", "email": f"sso{i}@example.com"}
+             for i in range(1200)]
+    users.append({"name": "Dup", "surname": "Email", "username": "dup", "email": "sso0@example.com"})
+    # Repeated within the call, in another chunk
+    users.append({"name": "Dup", "surname": "Username", "username": "sso1", "email": "other@example.com"})
+    response = client.post("/auth/users/bulk", headers=auth_headers, json=users)
+    assert response.status_code == 200
+    assert response.json() == {"created": 1200, "skipped": ["dup", "sso1"]}
+    assert session.exec(select(User.email).where(User.username == "sso1")).one() == "sso1@example.com"
+
+    again = client.post("/auth/users/bulk", headers=auth_headers, json=users[:3])
+    assert again.json() == {"created": 0, "skipped": ["sso0", "sso1", "sso2"]}
+    # No local password to log in with
+    assert client.post("/auth/login", data={"username": "sso1", "password": "!"}).status_code == 401
+
+
+def test_bulk_provision_requires_superuser(client, session):
+    token = create_access_token(username="plain", user_id=99, email="plain@example.com", is_superuser=False)
+    response = client.post("/auth/users/bulk", headers={"Authorization": f"Bearer {token}"}, json=[])
+    assert response.status_code == 401
@@ -0,0 +1,85 @@
+import asyncio
+import json
+
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import select, func
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from database import bulk_import
+from database.ingredient_index import IngredientIndex, ingredient_index
+from database.ingredient_search import IngredientSearchIndex, ingredient_search_index
+from models.recipes import Ingredient, Recipe, RecipeIngredientLink
+
+
+def _line(name, ingredients, duration="00:20:00"):
+    return json.dumps({"name": name, "difficulty": "easy", "recipe_type": "main", "steps": "Cook",
+                       "duration": duration, "ingredients": [{"name": i} for i in ingredients]})
+
+
+def test_bulk_import_ndjson(client, session, auth_headers):
+    ingredient_index.build([])
+    session.add(Ingredient(name="ajo"))
+    session.commit()
+    body = "\n".join([
+        _line("pan con ajo", ["Pan", "Ajo", "ajo"]),
+        "{not json",
+        _line("sopa de ajo", ["Ajo", "Pan", "Huevo"]),
+        _line("mala", ["Pan"], duration="veinte minutos"),
+        "",
+        _line("huevo duro", ["Huevo"]),
+    ])
+    response = client.post("/recipes/bulk_import", params={"chunk_size": 2}, headers=auth_headers,
+                           content=body)
+    assert response.status_code == 200
+    report = response.json()
+    assert report["imported"] == 3
+    assert report["failed"] == 2
+    assert [error["line"] for error in report["errors"]] == [2, 4]
+
+    assert session.exec(select(func.count()).select_from(Recipe)).one() == 3
+    assert sorted(session.exec(select(Ingredient.name)).all()) == ["ajo", "huevo", "pan"]
+    assert session.exec(select(func.count()).select_from(RecipeIngredientLink)).one() == 6
+
+    response = client.post("/recipes/recipe_by_ingredients", json=[{"name": "ajo"}, {"name": "huevo"}])
+    assert [recipe["name"] for recipe in response.json()] == ["sopa de ajo"]
+
+
+def test_bulk_import_reports_a_rejected_chunk_and_goes_on(client, session, auth_headers, monkeypatch):
+    insert_recipe_batch = bulk_import.insert_recipe_batch
+
+    async def failing_insert(batch, owner_id, session):
+        # Written in part, then rejected by the database
+        recipes = await insert_recipe_batch(batch, owner_id, session)
+        if any(recipe.name == "mala" for recipe in batch):
+            raise IntegrityError("INSERT", {}, Exception("constraint failed"))
+        return recipes
+
+    monkeypatch.setattr(bulk_import, "insert_recipe_batch", failing_insert)
+    body = "\n".join([_line("pan", ["Pan"]), _line("sopa", ["Caldo"]), _line("mala", ["Sal"]),
+                      "", _line("otra", ["Sal"]), _line("huevo duro", ["Huevo"])])
+    report = client.post("/recipes/bulk_import", params={"chunk_size": 2}, headers=auth_headers,
+                         content=body).json()
+    assert report == {"imported": 3, "failed": 2,
+                      "errors": [{"line": 3, "error": "lines 3-5: constraint failed"}]}
+    assert sorted(session.exec(select(Recipe.name)).all()) == ["huevo duro", "pan", "sopa"]
+    assert "sal" not in session.exec(select(Ingredient.name)).all()
+
+
+
+def test_import_from_another_process_is_seen_by_warm_indexes(client, session, async_engine, monkeypatch):
+    ingredient_index.build([])
+    ingredient_search_index.build([])
+    # manage.py import-recipes: its own cold indexes, the server's copies are not touched
+    monkeypatch.setattr(bulk_import, "ingredient_index", IngredientIndex())
+    monkeypatch.setattr(bulk_import, "ingredient_search_index", IngredientSearchIndex())
+
+    async def run_import():
+        async def lines():
+            yield _line("gazpacho", ["Tomate", "Pepino"])
+        async with AsyncSession(async_engine, expire_on_commit=False) as import_session:
+            return await bulk_import.import_recipes(lines(), import_session)
+    assert asyncio.run(run_import()).imported == 1
+
+    response = client.post("/recipes/recipe_by_ingredients", json=[{"name": "tomate"}, {"name": "pepino"}])
+    assert [recipe["name"] for recipe in response.json()] == ["gazpacho"]
+    assert [s["name"] for s in client.get("/recipes/ingredient_search", params={"q": "pep"}).json()] == ["pepino"]
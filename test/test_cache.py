@@ -0,0 +1,26 @@
+import time
+
+from database.cache import TTLCache
+
+
+def test_lru_eviction_and_counters():
+    cache = TTLCache(maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.stats() == {"size": 2, "hits": 3, "misses": 1}
+
+
+def test_expiry_and_tags():
+    cache = TTLCache(maxsize=10)
+    cache.set("old", 1, expires_at=time.time() - 1)
+    assert cache.get("old") is None
+    cache.set("x", 1, tags=(7,))
+    cache.set("y", 2, tags=(7, 8))
+    cache.set("z", 3, tags=(8,))
+    cache.invalidate_tag(7)
+    assert cache.get("x") is None and cache.get("y") is None
+    assert cache.get("z") == 3
@@ -0,0 +1,47 @@
+import asyncio
+import json
+
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from database.facets import rebuild_facets
+
+
+def test_facets_follow_writes_and_match_rebuild(client, async_engine, auth_headers, create_recipe):
+    create_recipe("Sopa", ["ajo", "agua"], difficulty="Easy", recipe_type="Main", duration="00:20:00")
+    create_recipe("Guiso", ["ajo", "carne"], difficulty="Hard", recipe_type="Main", duration="02:30:00")
+    create_recipe("Flan", ["huevo"], difficulty="Easy", recipe_type=None, duration="00:50:00")
+    lines = [json.dumps({"name": f"Tostada {i}", "difficulty": "Easy", "recipe_type": "Main", "steps": "Cook",
+                         "duration": "00:05:00", "ingredients": [{"name": "pan"}, {"name": "ajo"}]}) for i in range(2)]
+    client.post("/recipes/bulk_import", headers=auth_headers, content="\n".join(lines))
+    client.patch("/recipes/update_recipe/Flan", headers=auth_headers, json={"difficulty": "Medium"})
+    client.delete("/recipes/delete_recipe_by_name/Guiso", headers=auth_headers)
+    client.delete("/recipes/delete_ingredient_by_name/agua", headers=auth_headers)
+
+    facets = client.get("/recipes/facets").json()
+    assert facets["total"] == 4
+    assert facets["difficulty"] == [{"value": "Easy", "count": 3}, {"value": "Medium", "count": 1}]
+    assert facets["recipe_type"] == [{"value": "Main", "count": 3}, {"value": None, "count": 1}]
+    assert facets["duration"] == [{"value": "0-15m", "count": 2}, {"value": "15-30m", "count": 1},
+                                  {"value": "30-60m", "count": 1}]
+    assert [(i["name"], i["count"]) for i in facets["ingredients"]] == [("ajo", 3), ("pan", 2), ("huevo", 1)]
+
+    async def rebuild():
+        async with AsyncSession(async_engine) as session:
+            await rebuild_facets(session)
+    asyncio.run(rebuild())
+    assert client.get("/recipes/facets").json() == facets
+
+    # Restricted to the recipes recipe_by_ingredients would return
+    filtered = client.get("/recipes/facets", params={"ingredients": ["Ajo", "pan"], "top_ingredients": 1}).json()
+    assert filtered["total"] == 2
+    assert filtered["duration"] == [{"value": "0-15m", "count": 2}]
+    assert [(i["name"], i["count"]) for i in filtered["ingredients"]] == [("ajo", 2)]
+    assert client.get("/recipes/facets", params={"ingredients": ["nada"]}).json()["total"] == 0
+
+
+def test_tied_ingredients_keep_the_same_order_with_and_without_filter(client, create_recipe):
+    names = [f"ingrediente{i}" for i in range(1, 12)]
+    create_recipe("Todo", names)
+    unfiltered = client.get("/recipes/facets").json()["ingredients"]
+    filtered = client.get("/recipes/facets", params={"ingredients": ["ingrediente1"]}).json()["ingredients"]
+    assert [i["name"] for i in unfiltered] == [i["name"] for i in filtered] == names
@@ -0,0 +1,73 @@
+import asyncio
+
+from sqlalchemy import update
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from database.ingredient_index import IngredientIndex, ingredient_index
+from database.recipes import build_ingredient_index
+from models.recipes import IndexVersion
+
+
+def test_index_intersection():
+    index = IngredientIndex()
+    assert index.recipes_with_all([1]) is None
+    index.build([(1, 10), (1, 11), (2, 10), (3, 11), (3, 10), (3, 12)])
+    assert index.recipes_with_all([10, 11]) == [1, 3]
+    assert index.recipes_with_all([12]) == [3]
+    assert index.recipes_with_all([10, 99]) == []
+
+
+def test_index_incremental_updates():
+    index = IngredientIndex()
+    index.build([])
+    index.add_recipe(5, [1, 2])
+    index.add_recipe(3, [1])
+    assert index.recipes_with_all([1]) == [3, 5]
+    index.remove_recipe(5)
+    assert index.recipes_with_all([1]) == [3]
+    assert index.recipes_with_all([2]) == []
+    index.remove_ingredient(1)
+    assert index.ingredients_of(3) == ()
+
+
+def test_recipe_by_ingredients_index_and_sql_agree(client, auth_headers, create_recipe):
+    ingredient_index.build([])
+    tortilla = create_recipe("tortilla", ["Huevo", "Patata", "Cebolla"])
+    create_recipe("huevo frito", ["Huevo", "Aceite"])
+
+    body = [{"name": "huevo"}, {"name": "patata"}]
+    warm = client.post("/recipes/recipe_by_ingredients", json=body)
+    ingredient_index.clear()
+    cold = client.post("/recipes/recipe_by_ingredients", json=body)
+    assert warm.status_code == cold.status_code == 200
+    assert [r["id"] for r in warm.json()] == [r["id"] for r in cold.json()] == [tortilla["id"]]
+
+    ingredient_index.build([])
+    client.delete(f"/recipes/delete_recipe/{tortilla['id']}", headers=auth_headers)
+    response = client.post("/recipes/recipe_by_ingredients", json=body)
+    assert response.status_code == 404
+
+
+def test_writes_from_other_processes_send_reads_to_sql(client, session, async_engine, add_recipe, create_recipe):
+    ingredient_index.build([])
+    tortilla = create_recipe("tortilla", ["huevo", "patata"])["id"]
+    assert ingredient_index.version == 1
+
+    # Another worker, or manage.py, adds a recipe
+    other = add_recipe("tortilla de patatas", ["huevo", "patata", "cebolla"]).id
+    session.exec(update(IndexVersion).where(IndexVersion.name == "ingredient_index")
+                 .values(version=IndexVersion.version + 1))
+    session.commit()
+
+    body = [{"name": "huevo"}, {"name": "patata"}]
+    assert [r["id"] for r in client.post("/recipes/recipe_by_ingredients", json=body).json()] == [tortilla, other]
+    # This worker's own write does not make the copy look current again
+    create_recipe("revuelto", ["huevo"])
+    assert ingredient_index.version == 1
+
+    async def rebuild():
+        async with AsyncSession(async_engine) as async_session:
+            await build_ingredient_index(async_session)
+    asyncio.run(rebuild())
+    assert ingredient_index.version == 3
+    assert ingredient_index.recipes_with_all([1, 2]) == [tortilla, other]
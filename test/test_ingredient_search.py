@@ -0,0 +1,57 @@
+import asyncio
+
+from sqlalchemy import update
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from database.ingredient_search import IngredientSearchIndex, build_ingredient_search_index, ingredient_search_index
+from models.recipes import Ingredient, IndexVersion
+
+
+def test_prefix_and_fuzzy_ranking():
+    index = IngredientSearchIndex()
+    index.build([(1, "tomate"), (2, "tomatecherry"), (3, "tomillo"), (4, "patata"), (5, "cebolla")])
+    assert [name for _, name, _ in index.search("tom", 10)] == ["tomate", "tomillo", "tomatecherry"]
+    assert index.search("tomatoe", 1)[0][1] == "tomate"
+    assert index.search("Cebola", 5)[0][1] == "cebolla"
+    assert index.search("xyz", 5) == []
+
+    index.remove(1)
+    index.add(6, "tomatefrito")
+    assert [name for _, name, _ in index.search("tomate", 10)] == ["tomatefrito", "tomatecherry"]
+
+    # The closest match sorts after longer names sharing the prefix
+    index.build([(1, "salami"), (2, "salchicha"), (3, "salazon"), (4, "salsa")])
+    assert index.prefix("sal", 2) == ["salsa", "salami"]
+    assert index.search("sal", 1)[0][1] == "salsa"
+
+
+def test_search_endpoint_follows_writes(client, session, auth_headers):
+    session.add(Ingredient(name="tomate"))
+    session.commit()
+    # Cold index answers prefixes from the database
+    assert [s["name"] for s in client.get("/recipes/ingredient_search", params={"q": "TOM"}).json()] == ["tomate"]
+
+    ingredient_search_index.build([(1, "tomate")])
+    response = client.post("/recipes/create_ingredient", headers=auth_headers, json={"name": "Tomillo"})
+    tomillo = response.json()["id"]
+    assert [s["name"] for s in client.get("/recipes/ingredient_search", params={"q": "tomilo"}).json()] == ["tomillo"]
+
+    client.delete(f"/recipes/delete_ingredient/{tomillo}", headers=auth_headers)
+    assert client.get("/recipes/ingredient_search", params={"q": "tomilo"}).json() == []
+
+
+def test_ingredients_created_by_other_processes_are_found(client, session, async_engine):
+    ingredient_search_index.build([])
+    # Another worker, or manage.py, adds an ingredient
+    session.add(Ingredient(name="tomillo"))
+    session.exec(update(IndexVersion).where(IndexVersion.name == "ingredient_search")
+                 .values(version=IndexVersion.version + 1))
+    session.commit()
+    assert [s["name"] for s in client.get("/recipes/ingredient_search", params={"q": "tomi"}).json()] == ["tomillo"]
+
+    async def rebuild():
+        async with AsyncSession(async_engine) as async_session:
+            await build_ingredient_search_index(async_session)
+    asyncio.run(rebuild())
+    assert ingredient_search_index.version == 1
+    assert [s["name"] for s in client.get("/recipes/ingredient_search", params={"q": "tomilo"}).json()] == ["tomillo"]
@@ -0,0 +1,80 @@
+import json
+from datetime import timedelta
+
+import pytest
+from sqlmodel import select, text
+
+from database.recipes import recipe_list_query
+from models.auth import User
+from models.recipes import Ingredient
+
+
+@pytest.fixture(name="recipes")
+def recipes_fixture(session, add_recipe):
+    session.add_all(Ingredient(name=f"ingredient{i}") for i in range(1, 8))
+    return [add_recipe(f"recipe{i}", difficulty="easy" if i % 2 else "hard", duration=timedelta(minutes=10 * i))
+            for i in range(1, 8)]
+
+
+def test_list_recipes_keyset_pages_and_filters(client, recipes):
+    names, cursor = [], None
+    while True:
+        params = {"limit": 3, "difficulty": "easy"} | ({"cursor": cursor} if cursor else {})
+        page = client.get("/recipes/", params=params).json()
+        names += [recipe["name"] for recipe in page["results"]]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert names == ["recipe1", "recipe3", "recipe5", "recipe7"]
+
+    page = client.get("/recipes/", params={"max_duration": "00:30:00"}).json()
+    assert [recipe["name"] for recipe in page["results"]] == ["recipe1", "recipe2", "recipe3"]
+    assert client.get("/recipes/", params={"max_duration": "half an hour"}).status_code == 400
+    assert client.get("/recipes/", params={"cursor": "???"}).status_code == 400
+
+
+def test_ndjson_export(client, recipes):
+    response = client.get("/recipes/", params={"format": "ndjson", "recipe_type": "main"})
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [row["id"] for row in rows] == list(range(1, 8))
+
+    response = client.get("/recipes/ingredients", params={"format": "ndjson"})
+    assert len(response.text.splitlines()) == 7
+    page = client.get("/recipes/ingredients", params={"limit": 5}).json()
+    assert len(page["results"]) == 5 and page["next_cursor"]
+
+
+def test_batch_fetch_keeps_order_and_reports_missing(client, recipes, statements):
+    statements.clear()
+    body = client.get("/recipes/batch", params={"ids": [5, 1, 99, 3, 1]}).json()
+    assert [recipe["name"] for recipe in body["results"]] == ["recipe5", "recipe1", "recipe3"]
+    assert body["missing"] == [99]
+    assert len(statements) == 1
+
+    body = client.get("/recipes/batch", params={"ids": [2], "with_ingredients": True}).json()
+    assert body["results"][0]["ingredients"] == []
+    assert client.get("/recipes/batch", params={"ids": list(range(1, 102))}).status_code == 422
+
+
+def test_my_recipes_keyset_pages(client, session, recipes, add_recipe, auth_headers):
+    owner = session.exec(select(User)).one()
+    for i in range(1, 8):
+        add_recipe(f"mine{i}", owner_id=owner.id)
+
+    names, cursor = [], None
+    while True:
+        params = {"limit": 3} | ({"cursor": cursor} if cursor else {})
+        page = client.get("/recipes/mine", params=params, headers=auth_headers).json()
+        names += [recipe["name"] for recipe in page["results"]]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert names == [f"mine{i}" for i in range(1, 8)]
+    assert client.get("/recipes/mine").status_code == 401
+
+    # Served by the owner index, without sorting
+    query = recipe_list_query(3, owner_id=owner.id).limit(10)
+    plan = " ".join(row[-1] for row in session.exec(
+        text("EXPLAIN QUERY PLAN " + str(query.compile(compile_kwargs={"literal_binds": True})))))
+    assert "ix_recipe_owner_id" in plan and "TEMP B-TREE" not in plan
@@ -0,0 +1,76 @@
+from datetime import timedelta
+
+import pytest
+
+from database import meal_plans
+from database.meal_plans import shopping_list_cache
+
+
+@pytest.fixture(autouse=True)
+def fresh_shopping_list_cache():
+    shopping_list_cache.clear()
+    yield
+
+
+@pytest.fixture(name="recipes")
+def recipes_fixture(add_recipe):
+    # 'AJO' was stored before the current normalization rules
+    return [add_recipe("salsa", ["tomate", "ajo"], duration=timedelta(minutes=30)),
+            add_recipe("sopa", ["AJO", "sal"], recipe_type="soup", duration=timedelta(hours=1)),
+            add_recipe("nada", steps="Wait", duration=timedelta(minutes=15))]
+
+
+def test_shopping_list_merges_ingredients(client, recipes, statements):
+    plan = [{"recipe_id": 1, "servings": 2}, {"recipe_id": 2, "servings": 4}, {"recipe_id": 3},
+            {"recipe_id": 1, "servings": 2}, {"recipe_id": 99}]
+    statements.clear()
+    body = client.post("/recipes/shopping_list", json=plan).json()
+    assert len(statements) == 1
+    assert body["items"] == [{"name": "ajo", "servings": 8, "recipes": [1, 2]},
+                             {"name": "sal", "servings": 4, "recipes": [2]},
+                             {"name": "tomate", "servings": 4, "recipes": [1]}]
+    # The salsa is cooked twice
+    assert body["total_duration"] == "02:15:00"
+    assert body["missing"] == [99]
+
+
+def test_shopping_list_cache_and_invalidation(client, recipes, statements, auth_headers):
+    plan = [{"recipe_id": 1}, {"recipe_id": 2}]
+    first = client.post("/recipes/shopping_list", json=plan).json()
+    statements.clear()
+    assert client.post("/recipes/shopping_list", json=plan[::-1]).json() == first
+    assert statements == []
+
+    assert client.delete("/recipes/delete_recipe/2", headers=auth_headers).status_code == 200
+    body = client.post("/recipes/shopping_list", json=plan).json()
+    assert [item["name"] for item in body["items"]] == ["ajo", "tomate"]
+    assert body["missing"] == [2]
+
+    assert client.delete("/recipes/delete_ingredient_by_name/tomate", headers=auth_headers).status_code == 200
+    assert [item["name"] for item in client.post("/recipes/shopping_list", json=plan).json()["items"]] == ["ajo"]
+
+
+def test_shopping_list_for_a_large_plan(client, add_recipe, statements):
+    for i in range(100):
+        add_recipe(f"recipe{i}", [f"ingredient{j}" for j in range(i % 25, i % 25 + 5)], duration=timedelta(minutes=10))
+    statements.clear()
+    body = client.post("/recipes/shopping_list", json=[{"recipe_id": i} for i in range(1, 101)]).json()
+    assert len(statements) == 1
+    assert len(body["items"]) == 29 and sum(item["servings"] for item in body["items"]) == 500
+    assert body["total_duration"] == "16:40:00"
+    assert client.post("/recipes/shopping_list", json=[{"recipe_id": 1}] * 201).status_code == 422
+    assert client.post("/recipes/shopping_list", json=[]).status_code == 422
+
+
+def test_list_built_during_an_invalidation_is_not_cached(client, recipes, monkeypatch):
+    build = meal_plans.build_shopping_list
+
+    async def build_then_invalidate(plan, session):
+        built = await build(plan, session)
+        # An update committed while the list was being built
+        meal_plans.invalidate_shopping_lists(recipe_ids=[1])
+        return built
+
+    monkeypatch.setattr(meal_plans, "build_shopping_list", build_then_invalidate)
+    assert client.post("/recipes/shopping_list", json=[{"recipe_id": 1}]).status_code == 200
+    assert len(shopping_list_cache) == 0
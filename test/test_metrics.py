@@ -0,0 +1,84 @@
+import asyncio
+import logging
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from database.core import settings
+from database.database import create_db_engine
+from database.metrics import Histogram, Registry, db_checkout_seconds, instrument_engine, registry
+from models.recipes import Ingredient
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram("latency_seconds", "test", ("route",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3):
+        histogram.observe(value, "/a")
+    assert histogram.render()[2:] == [
+        'latency_seconds_bucket{route="/a",le="0.1"} 2',
+        'latency_seconds_bucket{route="/a",le="1.0"} 3',
+        'latency_seconds_bucket{route="/a",le="+Inf"} 4',
+        'latency_seconds_sum{route="/a"} 3.65',
+        'latency_seconds_count{route="/a"} 4',
+    ]
+
+
+def test_metrics_endpoint(client, session, async_engine, monkeypatch, caplog):
+    instrument_engine(async_engine, registry=Registry())
+    session.add(Ingredient(name="ajo"))
+    session.commit()
+    monkeypatch.setattr(settings, "SLOW_QUERY_SECONDS", 0)
+
+    with caplog.at_level(logging.WARNING, logger="recipes.slow_queries"):
+        assert client.get("/recipes/ingredient_by_id/1").status_code == 200
+    assert any("Slow query" in record.message for record in caplog.records)
+
+    body = client.get("/metrics").text
+    # Route templates, not raw paths, and the SQL of the request attributed to it
+    assert 'http_request_duration_seconds_count{method="GET",route="/recipes/ingredient_by_id/{ingredient_id}",status="200"}' in body
+    assert 'http_request_db_queries_bucket{route="/recipes/ingredient_by_id/{ingredient_id}",le="1"}' in body
+    assert 'http_request_db_queries_bucket{route="/recipes/ingredient_by_id/{ingredient_id}",le="0"} 0' in body
+    for name in ("db_queries_total", "db_pool_checkout_wait_seconds_count", "password_pool_pending",
+                 "token_cache_hits_total"):
+        assert f"\n{name}" in body
+
+
+def test_pool_instrumentation_survives_dispose(database_url, session):
+    engine = create_db_engine(database_url)
+    local = Registry()
+    app_gauges = dict(registry._callbacks)
+    instrument_engine(engine, registry=local)
+    # The app's own pool gauges are left alone
+    assert registry._callbacks == app_gauges
+
+    async def scenario():
+        checkouts = db_checkout_seconds.count()
+        async with engine.connect():
+            assert "\ndb_pool_checkedout 1\n" in local.render()
+        await engine.dispose()
+        async with engine.connect():
+            assert "\ndb_pool_checkedout 1\n" in local.render()
+        await engine.dispose()
+        assert db_checkout_seconds.count() == checkouts + 2
+        assert "\ndb_pool_checkedout 0\n" in local.render()
+
+    asyncio.run(scenario())
+
+
+def test_failed_statements_leave_nothing_on_the_connection(database_url, session):
+    engine = create_db_engine(database_url)
+    instrument_engine(engine, registry=Registry())
+
+    async def scenario():
+        for _ in range(3):
+            async with engine.connect() as connection:
+                with pytest.raises(OperationalError):
+                    await connection.execute(text("SELECT * FROM missing_table"))
+        # The single pooled connection every attempt went through
+        async with engine.connect() as connection:
+            info = await connection.run_sync(lambda sync_connection: dict(sync_connection.info))
+        await engine.dispose()
+        return info
+
+    assert asyncio.run(scenario()).get("query_start", []) == []
@@ -0,0 +1,151 @@
+import asyncio
+import os
+import subprocess
+import sys
+from datetime import timedelta
+
+import pytest
+from alembic import command
+from alembic.script import ScriptDirectory
+from fastapi.testclient import TestClient
+from sqlalchemy import (Boolean, Column, ForeignKey, Integer, Interval, MetaData, String, Table, create_engine,
+                        inspect)
+from sqlalchemy.pool import NullPool
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from main import app
+from database.auth import create_access_token
+from database.database import create_db_engine, get_session, get_read_session
+from database.schema import SCHEMA_REVISION, alembic_config, check_schema
+
+# Seconds for `import main` in a fresh interpreter; about 1.3 s on a laptop, mostly FastAPI and SQLAlchemy
+IMPORT_BUDGET = 3.0
+
+
+def test_schema_revision_is_latest_script():
+    assert ScriptDirectory.from_config(alembic_config()).get_current_head() == SCHEMA_REVISION
+
+
+def test_migrations_match_models(database_url):
+    config = alembic_config(database_url)
+    command.upgrade(config, "head")
+    # Raises if the models have changes no script covers
+    command.check(config)
+
+    engine = create_engine(database_url)
+    inspector = inspect(engine)
+    assert "recipe_fts" in inspector.get_table_names()
+    assert {"ix_recipe_owner_id"} <= {index["name"] for index in inspector.get_indexes("recipe")}
+    assert {"ix_recipeingredientlink_ingredient_id"} <= {
+        index["name"] for index in inspector.get_indexes("recipeingredientlink")}
+    engine.dispose()
+
+    command.downgrade(config, "base")
+
+
+def test_startup_requires_latest_revision(database_url):
+    config = alembic_config(database_url)
+    engine = create_db_engine(database_url, poolclass=NullPool)
+
+    with pytest.raises(RuntimeError, match="alembic upgrade head"):
+        asyncio.run(check_schema(engine))
+    command.upgrade(config, "0001")
+    with pytest.raises(RuntimeError, match="revision 0001"):
+        asyncio.run(check_schema(engine))
+    command.upgrade(config, "head")
+    asyncio.run(check_schema(engine))
+
+
+def test_app_refuses_to_start_on_unmigrated_database():
+    with pytest.raises(RuntimeError, match="revision none"):
+        with TestClient(app):
+            pass
+
+
+def test_app_import_time():
+    env = os.environ | {"DATABASE_URL": "sqlite://"}
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import main"], env=env,
+                            capture_output=True, text=True, check=True, cwd=os.path.dirname(os.path.dirname(__file__)))
+    modules = {}
+    for line in result.stderr.splitlines():
+        if line.startswith("import time:") and "|" in line and "cumulative" not in line:
+            _, cumulative, name = line.split("|")
+            modules[name.strip()] = int(cumulative) / 1_000_000
+    # Migration tooling stays out of the app process
+    assert not any(name == "alembic" or name.startswith("alembic.") for name in modules)
+    assert modules["main"] < IMPORT_BUDGET
+
+
+# The tables as the first release's models built them with metadata.create_all
+BASELINE = MetaData()
+Table("user", BASELINE, Column("name", String, nullable=False), Column("surname", String, nullable=False),
+      Column("username", String, nullable=False, index=True, unique=True), Column("email", String, nullable=False),
+      Column("id", Integer, primary_key=True), Column("hashed_password", String, nullable=False),
+      Column("is_active", Boolean), Column("is_superuser", Boolean))
+Table("ingredient", BASELINE, Column("name", String, nullable=False, index=True, unique=True),
+      Column("id", Integer, primary_key=True))
+Table("recipe", BASELINE, Column("name", String, nullable=False, index=True),
+      Column("difficulty", String, nullable=False), Column("recipe_type", String), Column("steps", String(200)),
+      Column("id", Integer, primary_key=True), Column("duration", Interval, nullable=False),
+      Column("owner_id", Integer, ForeignKey("user.id")))
+Table("recipeingredientlink", BASELINE, Column("recipe_id", Integer, ForeignKey("recipe.id"), primary_key=True),
+      Column("ingredient_id", Integer, ForeignKey("ingredient.id"), primary_key=True))
+
+
+def _baseline_database(database_url, emails=("ana@example.com",)):
+    engine = create_engine(database_url)
+    BASELINE.create_all(engine)
+    tables = BASELINE.tables
+    with engine.begin() as connection:
+        connection.execute(tables["user"].insert(), [
+            {"id": i, "name": "Ana", "surname": "Gil", "username": f"ana{i}", "email": email,
+             "hashed_password": "!", "is_active": True, "is_superuser": False} for i, email in enumerate(emails, 1)])
+        connection.execute(tables["ingredient"].insert(), [{"id": 1, "name": "huevo"}, {"id": 2, "name": "patata"}])
+        connection.execute(tables["recipe"].insert(), [
+            {"id": 1, "name": "Tortilla de patatas", "difficulty": "Easy", "recipe_type": "Main",
+             "steps": "Freír las patatas", "duration": timedelta(minutes=40), "owner_id": 1}])
+        connection.execute(tables["recipeingredientlink"].insert(),
+                           [{"recipe_id": 1, "ingredient_id": 1}, {"recipe_id": 1, "ingredient_id": 2}])
+    engine.dispose()
+
+
+def test_baseline_database_upgrades_to_a_working_app(tmp_path):
+    database_url = f"sqlite:///{tmp_path / 'legacy.db'}"
+    _baseline_database(database_url)
+    config = alembic_config(database_url)
+    command.stamp(config, "0001")
+    command.upgrade(config, "head")
+
+    engine = create_db_engine(database_url, poolclass=NullPool)
+    asyncio.run(check_schema(engine))
+
+    async def get_session_override():
+        async with AsyncSession(engine, expire_on_commit=False) as session:
+            yield session
+
+    app.dependency_overrides[get_session] = get_session_override
+    app.dependency_overrides[get_read_session] = get_session_override
+    try:
+        client = TestClient(app)
+        hits = client.get("/recipes/search", params={"q": "freir"}).json()["results"]
+        assert [hit["recipe"]["name"] for hit in hits] == ["Tortilla de patatas"]
+        facets = client.get("/recipes/facets").json()
+        assert facets["total"] == 1 and {i["name"] for i in facets["ingredients"]} == {"huevo", "patata"}
+
+        headers = {"Authorization": f"Bearer {create_access_token('ana1', 1, 'ana@example.com', False)}"}
+        recipe = {"name": "Huevo frito", "difficulty": "Easy", "recipe_type": "Main", "steps": "Freír",
+                  "duration": "00:05:00", "ingredients": [{"name": "huevo"}]}
+        assert client.post("/recipes/create_recipe", json=recipe, headers=headers).status_code == 201
+        assert client.get("/recipes/facets").json()["total"] == 2
+        assert len(client.get("/recipes/search", params={"q": "frito"}).json()["results"]) == 1
+    finally:
+        app.dependency_overrides.clear()
+
+
+def test_upgrade_stops_on_duplicate_emails(tmp_path):
+    database_url = f"sqlite:///{tmp_path / 'legacy.db'}"
+    _baseline_database(database_url, emails=("ana@example.com", "ana@example.com"))
+    config = alembic_config(database_url)
+    command.stamp(config, "0001")
+    with pytest.raises(RuntimeError, match="ana@example.com"):
+        command.upgrade(config, "head")
@@ -0,0 +1,39 @@
+import asyncio
+
+import manage
+from database import database
+from database.ingredient_search import ingredient_search_index
+from database.normalization import fold_accents, normalize_ingredient_name, normalize_ingredient_names
+from database.utils import format_ingredient_name
+from models.recipes import Ingredient, IngredientBase
+
+
+def test_normalize_folds_every_accent_and_whitespace():
+    assert normalize_ingredient_name(" Jalapeño ") == "jalapeno"
+    assert normalize_ingredient_name("Crème  Brûlée") == "cremebrulee"
+    assert normalize_ingredient_name("ACEITE DE OLIVA") == "aceitedeoliva"
+    assert format_ingredient_name("Azúcar\tmoreno") == "azucarmoreno"
+    assert fold_accents("Piñón Ácido") == "pinon acido"
+    assert normalize_ingredient_name("Smørre Brød") == "smørrebrød"
+
+
+def test_batch_matches_single():
+    names = ["Ñora", "pan rallado", "Champiñón", "", "a\x1fb", "Limón"]
+    assert normalize_ingredient_names(names) == [normalize_ingredient_name(name) for name in names]
+    assert normalize_ingredient_names(["Ñora", "Limón"]) == ["nora", "limon"]
+
+
+def test_ingredient_model_keeps_normalized_name():
+    assert IngredientBase(name="Limón ").name == "limon"
+
+
+def test_normalize_command_is_seen_by_running_servers(client, session, async_engine, monkeypatch):
+    # Stored under older rules
+    session.add(Ingredient(name="TOMATE"))
+    session.commit()
+    ingredient_search_index.build([(1, "TOMATE")])
+
+    monkeypatch.setattr(database, "engine", async_engine)
+    assert asyncio.run(manage.normalize_ingredients_command(None)) == 0
+    assert client.get("/recipes/ingredient_search", params={"q": "tomate"}).json() == [
+        {"id": 1, "name": "tomate", "score": 1.0}]
@@ -0,0 +1,44 @@
+import pytest
+
+
+def count_statements(statements, call) -> int:
+    before = len(statements)
+    response = call()
+    assert response.status_code == 200
+    return len(statements) - before
+
+
+@pytest.mark.parametrize("count", [4, 60])
+def test_query_count_does_not_grow_with_results(client, add_recipe, statements, count):
+    for i in range(count):
+        add_recipe(f"recipe{i}", ["sal", "huevo"] if i % 2 else ["sal"], recipe_type=None, steps=None)
+
+    listing = lambda: client.get("/recipes/", params={"with_ingredients": True, "limit": 100})
+    by_ingredients = lambda: client.post("/recipes/recipe_by_ingredients", params={"with_ingredients": True},
+                                         json=[{"name": "sal"}])
+    by_id = lambda: client.get("/recipes/2", params={"with_ingredients": True})
+    # recipes + one selectin load of their ingredients; by_ingredients also resolves names and matching ids
+    assert count_statements(statements, listing) == 2
+    assert count_statements(statements, by_ingredients) == 4
+    assert count_statements(statements, by_id) == 2
+
+    recipes = listing().json()["results"]
+    assert len(recipes) == count
+    assert [i["name"] for i in recipes[1]["ingredients"]] == ["sal", "huevo"]
+    assert "ingredients" not in client.get("/recipes/").json()["results"][0]
+    assert [i["name"] for i in by_id().json()["ingredients"]] == ["sal", "huevo"]
+
+
+def test_match_and_search_results_with_ingredients(client, create_recipe):
+    create_recipe("Tortilla", ["patata", "huevo", "cebolla"])
+    create_recipe("Huevo frito", ["huevo", "aceite"])
+
+    matches = client.post("/recipes/what_can_i_cook", params={"with_ingredients": True},
+                          json=[{"name": "huevo"}, {"name": "aceite"}]).json()["results"]
+    assert [[i["name"] for i in m["recipe"]["ingredients"]] for m in matches] == [
+        ["huevo", "aceite"], ["patata", "huevo", "cebolla"]]
+    hits = client.get("/recipes/search", params={"q": "tortilla", "with_ingredients": True}).json()["results"]
+    assert [i["name"] for i in hits[0]["recipe"]["ingredients"]] == ["patata", "huevo", "cebolla"]
+
+    assert "ingredients" not in client.post("/recipes/what_can_i_cook", json=[{"name": "huevo"}]).json()["results"][0]["recipe"]
+    assert "ingredients" not in client.get("/recipes/search", params={"q": "tortilla"}).json()["results"][0]["recipe"]
@@ -0,0 +1,55 @@
+import asyncio
+import json
+
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from database.recipe_search import like_search_recipe_ids
+
+
+
+def search(client, q, **params):
+    response = client.get("/recipes/search", params={"q": q, **params})
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_search_ranks_and_follows_writes(client, auth_headers, create_recipe):
+    create_recipe("Tortilla de patatas", ["huevo"], recipe_type="Main", steps="Freír las patatas")
+    create_recipe("Crema", ["huevo"], recipe_type="Dessert", steps="Añadir la tortilla rota")
+
+    # Name hits rank above step hits, accents and case are ignored, last word is a prefix
+    assert [hit["recipe"]["name"] for hit in search(client, "TORTILLA")["results"]] == ["Tortilla de patatas", "Crema"]
+    assert [hit["recipe"]["name"] for hit in search(client, "freir pat")["results"]] == ["Tortilla de patatas"]
+    assert [hit["recipe"]["name"] for hit in search(client, "anadir")["results"]] == ["Crema"]
+
+    page = search(client, "tortilla", limit=1)
+    assert page["next_offset"] == 1
+    assert search(client, "tortilla", limit=1, offset=1)["next_offset"] is None
+
+    client.patch("/recipes/update_recipe/Crema", headers=auth_headers, json={"steps": "Batir"})
+    assert [hit["recipe"]["name"] for hit in search(client, "tortilla")["results"]] == ["Tortilla de patatas"]
+
+    client.delete("/recipes/delete_recipe_by_name/Tortilla de patatas", headers=auth_headers)
+    assert search(client, "tortilla")["results"] == []
+    assert search(client, "\"*")["results"] == []
+
+
+def test_bulk_import_is_searchable(client, auth_headers):
+    lines = [json.dumps({"name": f"Gazpacho {i}", "difficulty": "Easy", "recipe_type": "Soup", "steps": "Triturar",
+                         "duration": "00:30:00", "ingredients": [{"name": "tomate"}]}) for i in range(3)]
+    client.post("/recipes/bulk_import", headers=auth_headers, content="\n".join(lines))
+    assert len(search(client, "gazpacho")["results"]) == 3
+
+
+def test_like_fallback_for_other_databases(async_engine, add_recipe):
+    add_recipe("Tortilla de patatas", steps="Batir los huevos")
+    add_recipe("Huevos rotos", steps="Freír 50% patatas")
+
+    async def run(terms):
+        async with AsyncSession(async_engine) as session:
+            return await like_search_recipe_ids(terms, 10, 0, session)
+
+    assert asyncio.run(run(["huevos"])) == [(2, 1.0), (1, 0.0)]
+    assert asyncio.run(run(["patatas", "tortilla"])) == [(1, 2.0)]
+    assert asyncio.run(run(["50%"])) == [(2, 0.0)]
+    assert asyncio.run(run(["%"])) == [(2, 0.0)]
@@ -0,0 +1,88 @@
+import asyncio
+import time
+
+import pytest
+
+from database.response_cache import response_cache, RedisBackend, etag_matches
+from models.recipes import Ingredient
+
+
+class FakeRedis:
+    # The subset of redis.asyncio.Redis used by RedisBackend
+    def __init__(self):
+        self.data = {}
+
+    async def get(self, key):
+        value, expires_at = self.data.get(key, (None, None))
+        if expires_at is not None and expires_at <= time.time():
+            del self.data[key]
+            return None
+        return value
+
+    async def set(self, key, value, ex=None):
+        self.data[key] = (value, time.time() + ex if ex else None)
+
+    async def delete(self, *keys):
+        for key in keys:
+            self.data.pop(key, None)
+
+
+@pytest.fixture(params=["memory", "redis"])
+def backend(request):
+    if request.param == "redis":
+        response_cache.backend = RedisBackend(FakeRedis())
+    return request.param
+
+
+def test_read_through_etag_and_invalidation(backend, client, session, auth_headers, statements):
+    session.add(Ingredient(name="ajo"))
+    session.commit()
+
+    first = client.get("/recipes/ingredient_by_id/1")
+    assert first.status_code == 200 and first.json() == {"name": "ajo", "id": 1}
+    etag = first.headers["etag"]
+    queries = len(statements)
+
+    assert client.get("/recipes/ingredient_by_id/1").json() == first.json()
+    not_modified = client.get("/recipes/ingredient_by_id/1", headers={"If-None-Match": f'"other",W/{etag}'})
+    assert not_modified.status_code == 304 and not_modified.headers["etag"] == etag
+    assert len(statements) == queries
+
+    assert client.delete("/recipes/delete_ingredient/1", headers=auth_headers).status_code == 200
+    assert client.get("/recipes/ingredient_by_id/1").status_code == 404
+
+
+def test_update_recipe_invalidates(backend, client, auth_headers):
+    response = client.post("/recipes/create_recipe", headers=auth_headers, json={
+        "name": "tortilla", "difficulty": "easy", "recipe_type": "main", "steps": "Cook",
+        "duration": "00:30:00", "ingredients": [{"name": "huevo"}]})
+    recipe_id = response.json()["id"]
+    assert client.get(f"/recipes/{recipe_id}").json()["difficulty"] == "easy"
+    assert client.get("/recipes/recipe_by_name/tortilla").json()["difficulty"] == "easy"
+
+    client.patch("/recipes/update_recipe/tortilla", headers=auth_headers, json={"difficulty": "hard"})
+    assert client.get(f"/recipes/{recipe_id}").json()["difficulty"] == "hard"
+    assert client.get("/recipes/recipe_by_name/tortilla").json()["difficulty"] == "hard"
+
+
+def test_etag_matches_lists_weak_tags_and_star():
+    assert etag_matches('"a","b"', '"b"')
+    assert etag_matches(' "a" ,  W/"b" ', '"b"')
+    assert etag_matches('W/"b"', '"b"')
+    assert etag_matches('*', '"b"')
+    assert not etag_matches('"a", "bc"', '"b"')
+    assert not etag_matches(None, '"b"')
+
+
+def test_invalidation_during_load_is_not_overwritten(backend):
+    asyncio.run(invalidate_during_load())
+
+
+async def invalidate_during_load():
+    generation = await response_cache.generation("ingredient:id:1")
+    await response_cache.invalidate("ingredient:id:1")
+    await response_cache.set("ingredient:id:1", b'{"name": "old"}', generation)
+    assert await response_cache.get("ingredient:id:1") is None
+
+    await response_cache.set("ingredient:id:1", b'{"name": "new"}', await response_cache.generation("ingredient:id:1"))
+    assert (await response_cache.get("ingredient:id:1"))[1] == b'{"name": "new"}'
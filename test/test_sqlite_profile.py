@@ -0,0 +1,87 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.pool import NullPool
+from sqlmodel import text
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from main import app
+from database import auth
+from database.database import create_db_engine, get_session, get_read_session
+
+
+def test_pragmas_on_every_connection_and_read_only_pool(database_url, session):
+    async def scenario():
+        # NullPool: each connect() opens a new SQLite connection
+        writer = create_db_engine(database_url, poolclass=NullPool)
+        reader = create_db_engine(database_url, read_only=True)
+        async with writer.connect() as first, writer.connect() as second:
+            for connection in (first, second):
+                assert (await connection.execute(text("PRAGMA foreign_keys"))).scalar() == 1
+                assert (await connection.execute(text("PRAGMA journal_mode"))).scalar() == "wal"
+                assert (await connection.execute(text("PRAGMA synchronous"))).scalar() == 1
+        async with reader.connect() as connection:
+            assert (await connection.execute(text("SELECT count(*) FROM ingredient"))).scalar() == 0
+            with pytest.raises(OperationalError):
+                await connection.execute(text("INSERT INTO ingredient (name) VALUES ('ajo')"))
+        await writer.dispose()
+        await reader.dispose()
+
+    asyncio.run(scenario())
+
+
+def test_writes_queue_for_the_single_writer_connection(database_url, session):
+    async def scenario():
+        writer = create_db_engine(database_url)
+        order = []
+
+        async def write(name: str, hold: float):
+            async with writer.begin() as connection:
+                order.append(f"{name} start")
+                await connection.execute(text("INSERT INTO ingredient (name) VALUES (:name)"), {"name": name})
+                await asyncio.sleep(hold)
+                order.append(f"{name} end")
+
+        await asyncio.gather(write("ajo", 0.05), write("sal", 0))
+        await writer.dispose()
+        return order
+
+    assert asyncio.run(scenario()) == ["ajo start", "ajo end", "sal start", "sal end"]
+
+
+def test_logins_do_not_hold_the_writer_during_bcrypt(database_url, auth_headers, monkeypatch):
+    async def slow_verify(password, hashed_password):
+        await asyncio.sleep(0.2)
+        return True, None
+    monkeypatch.setattr(auth, "verify_password", slow_verify)
+
+    async def scenario():
+        writer = create_db_engine(database_url)
+
+        async def get_writer_session():
+            async with AsyncSession(writer, expire_on_commit=False) as session:
+                yield session
+
+        app.dependency_overrides[get_session] = get_writer_session
+        app.dependency_overrides[get_read_session] = get_writer_session
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            async def create_ingredient():
+                await asyncio.sleep(0.05)
+                start = time.perf_counter()
+                response = await client.post("/recipes/create_ingredient", json={"name": "ajo"}, headers=auth_headers)
+                return response.status_code, time.perf_counter() - start
+
+            logins = [client.post("/auth/login", data={"username": "tester", "password": "secret"}) for _ in range(8)]
+            *responses, (status_code, elapsed) = await asyncio.gather(*logins, create_ingredient())
+        app.dependency_overrides.clear()
+        await writer.dispose()
+        return [response.status_code for response in responses], status_code, elapsed
+
+    logins, status_code, elapsed = asyncio.run(scenario())
+    assert logins == [200] * 8 and status_code == 201
+    # Queued behind the password checks it would take 8 x 0.2 s
+    assert elapsed < 0.2
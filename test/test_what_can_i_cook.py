@@ -0,0 +1,48 @@
+from sqlalchemy import update
+
+from database.ingredient_index import ingredient_index
+from models.recipes import IndexVersion
+
+
+def _pages(client, pantry, limit):
+    cursor, ranked = None, []
+    while True:
+        params = {"limit": limit} | ({"cursor": cursor} if cursor else {})
+        response = client.post("/recipes/what_can_i_cook", params=params, json=pantry)
+        assert response.status_code == 200
+        page = response.json()
+        ranked.extend((r["recipe"]["id"], r["matched"], r["missing"]) for r in page["results"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return ranked
+
+
+def test_ranked_partial_match_with_cursor(client, create_recipe):
+    ingredient_index.build([])
+    tortilla = create_recipe("tortilla", ["huevo", "patata", "cebolla"])["id"]
+    frito = create_recipe("huevo frito", ["huevo", "aceite"])["id"]
+    pure = create_recipe("pure", ["patata", "leche", "mantequilla", "sal"])["id"]
+    create_recipe("ensalada", ["lechuga"])
+
+    pantry = [{"name": "Huevo"}, {"name": "Aceite"}, {"name": "Patata"}, {"name": "Trufa"}]
+    expected = [(frito, 2, 0), (tortilla, 2, 1), (pure, 1, 3)]
+    assert _pages(client, pantry, limit=2) == expected
+
+    ingredient_index.clear()
+    assert _pages(client, pantry, limit=1) == expected
+
+
+def test_invalid_cursor(client):
+    response = client.post("/recipes/what_can_i_cook", params={"cursor": "nope"}, json=[])
+    assert response.status_code == 400
+
+
+def test_recipes_added_by_other_processes_are_ranked(client, session, create_recipe, add_recipe):
+    ingredient_index.build([])
+    tortilla = create_recipe("tortilla", ["huevo", "patata"])["id"]
+    # Another worker, or manage.py, adds a recipe
+    frito = add_recipe("huevo frito", ["huevo"]).id
+    session.exec(update(IndexVersion).where(IndexVersion.name == "ingredient_index")
+                 .values(version=IndexVersion.version + 1))
+    session.commit()
+    assert _pages(client, [{"name": "huevo"}], limit=5) == [(frito, 1, 0), (tortilla, 1, 1)]